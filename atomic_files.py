@@ -0,0 +1,38 @@
+# Writing files in one step
+
+# This file saves files (chart PDFs, the chart manifest and parsed songs in
+# the disk cache) by writing them to a uniquely named temporary file in the
+# same folder and renaming it into place, so anyone reading the file, or
+# writing the same file at the same time, never sees it half written.
+
+# Temporary files are created readable only by their owner, so the file is
+# given the permissions a newly created file normally gets (0666 less the
+# umask, e.g. -rw-r--r--) before it's renamed into place.
+
+
+
+
+# Importing Libraries
+import os
+import tempfile
+
+
+# the process's umask (it can only be read by setting it, so it's read once, when this file is imported)
+umask = os.umask(0)
+os.umask(umask)
+
+
+
+def write_atomic(path, data):
+
+    ''' Save data (bytes) to path through a temporary file and a rename, with the usual permissions for a new file. '''
+
+    temp_file, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(temp_file, 'wb') as f:
+            os.fchmod(f.fileno(), 0o666 & ~umask)
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
@@ -0,0 +1,376 @@
+# Printing chord charts for many songs in parallel
+
+# This file prints every song in the txt_input_files folder (or the songs
+# given) in every key, spreading the songs across a pool of worker processes.
+# Each worker loads the fonts, logo and music theory tables once when it
+# starts, and every key of a song is printed by the same worker so the song
+# is only parsed once. A chart that fails is reported at the end instead of
+# stopping the rest of the batch.
+
+# Only charts that are out of date get printed: a manifest of every chart
+# printed so far (see chart_manifest) records the song file hash and renderer
+# version each chart came from, so editing one song only reprints that song.
+# When the whole folder is printed, the charts of deleted songs are removed.
+
+# With --one-file, each song is printed as one PDF with a page for each key
+# (the fonts and logo are then stored once per song instead of once per key).
+
+# With --timing, a record of how long each stage of each chart took is added
+# to a file (json lines), and with --profile, cProfile stats for each song are
+# saved in a folder (see chart_timing).
+
+# With --watch, the folder is checked every --interval seconds and any songs
+# that were added, edited or deleted are printed (or removed) once the files
+# have stopped changing for --debounce seconds, with the workers kept warm
+# in between.
+
+# Usage: python batch_chord_charts.py [song.txt ...] [--keys C G D] [--jobs 4] [--force] [--one-file]
+#        python batch_chord_charts.py --timing timing.jsonl --profile profiles
+#        python batch_chord_charts.py --watch [--keys C G D] [--jobs 4] [--one-file] [--interval 1] [--debounce 2]
+
+
+
+
+# Importing Libraries
+import io
+import os
+import sys
+import time
+import signal
+import argparse
+import contextlib
+import concurrent.futures
+
+from build_chord_chart_function import master_path, input_dir, output_dir, font_dir, logo_path, renderer_version, read_logo, build_chord_chart, build_chord_chart_book
+from chart_fonts import register_fonts
+from song_model import drop_parsed_song
+from chart_timing import enable_timing, enable_profiling, profiled
+from chart_manifest import hash_song_file, load_manifest, save_manifest, stale_keys, record_chart, remove_song
+
+
+# the 15 keys we print every song in (all keys that don't require double sharps or flats)
+all_keys = ['C', 'F', 'Bb', 'Eb', 'Ab', 'Db', 'Gb', 'Cb', 'G', 'D', 'A', 'E', 'B', 'F#', 'C#']
+
+# folder with the songs, and the manifest of printed charts (next to the pdf_chord_charts folder)
+song_folder = input_dir
+manifest_path = master_path + '/pdf_chord_charts_manifest.json'
+
+
+
+###############################################################################
+
+# work done in each worker process
+
+def warm_worker():
+
+    '''
+    Load everything a chart needs once per worker (the PDF libraries, the
+    fonts and the logo - the music theory tables are built when
+    build_chord_chart_function is imported), so no chart pays for it.
+    '''
+
+    import reportlab.pdfgen.canvas
+    import pdfrw.toreportlab
+
+    register_fonts(font_dir)
+    read_logo(logo_path)
+
+
+
+def start_worker():
+    ''' Set up a worker process in the pool (Ctrl+C is left to the main process, which stops the workers). '''
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    warm_worker()
+
+
+
+def print_song(song, keys, one_file=False, input_dir=input_dir, output_dir=output_dir):
+
+    '''
+    Print one song in each of the keys (as one PDF with a page for each key
+    with one_file). Returns the song, a list of (key, pdf path) for the keys
+    that were printed, a list of (key, error message) for the keys that
+    failed and the time taken.
+    '''
+
+    start = time.perf_counter()
+
+    # profile the whole song (when profiling is turned on), rather than each key on its own
+    with profiled(song[:-len('.txt')]):
+        printed, errors = print_song_keys(song, keys, one_file, input_dir, output_dir)
+
+
+    return(song, printed, errors, time.perf_counter() - start)
+
+
+
+def print_song_keys(song, keys, one_file=False, input_dir=input_dir, output_dir=output_dir):
+
+    '''
+    Print one song in each of the keys (see print_song). Returns the printed
+    keys and errors. Nothing from the song is kept once it's printed: each
+    chart's canvas and PDF are dropped as soon as the chart is written, and
+    the parsed song is dropped from the parse cache at the end (a batch
+    never prints the same song twice, so on a long batch the cache would
+    only fill up with songs that are done).
+    '''
+
+    printed = []
+    errors = []
+
+    try:
+        if one_file:
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    path = build_chord_chart_book(song, keys, input_dir=input_dir, output_dir=output_dir)
+                printed = [(key, path) for key in keys]
+            except Exception as error:
+                errors = [(key, type(error).__name__ + ': ' + str(error)) for key in keys]
+
+            return(printed, errors)
+
+
+        for key in keys:
+
+            # the song is parsed on the first key and comes out of the parse cache for the rest
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    printed.append((key, build_chord_chart(song, key, input_dir=input_dir, output_dir=output_dir)))
+            except Exception as error:
+                errors.append((key, type(error).__name__ + ': ' + str(error)))
+
+    finally:
+        drop_parsed_song(os.path.join(input_dir, song))
+
+
+    return(printed, errors)
+
+
+
+###############################################################################
+
+# define a function to print a batch of songs in a list of keys
+
+def batch_chord_charts(songs, keys=all_keys, jobs=None, force=False, remove_deleted=False, pool=None, one_file=False):
+
+    '''
+    Print every song in every key that is out of date (or every chart, with
+    force), as one PDF per song with one_file, using a pool of jobs worker processes (default: one per cpu, 1
+    prints everything in this process). With remove_deleted, the charts of
+    songs in the manifest that aren't in songs are removed. A pool of
+    workers that is already running can be passed in to use instead of
+    starting a new one. Prints a line as each song finishes and a summary at
+    the end, and returns a list of (song, key, error message) for the charts
+    that failed.
+    '''
+
+    jobs = jobs or os.cpu_count() or 1
+    failures = []
+    charts = 0
+    busy_time = 0
+    start = time.perf_counter()
+
+
+    # work out which charts need printing from the manifest
+    manifest = load_manifest(manifest_path)
+    song_hashes = {song: hash_song_file(os.path.join(song_folder, song)) for song in songs}
+
+    # with one_file, a song has a single manifest entry ('all keys') for its PDF of every key, which
+    # also has to be printed again if the list of keys changes (so the keys count as part of the version)
+    if one_file:
+        version = renderer_version + ' (' + ' '.join(keys) + ')'
+        todo = {song: keys for song in songs
+                if force or stale_keys(manifest, song, song_hashes[song], ['all keys'], version, master_path)}
+    else:
+        version = renderer_version
+        todo = {song: keys if force else stale_keys(manifest, song, song_hashes[song], keys, version, master_path)
+                for song in songs}
+        todo = {song: song_keys for song, song_keys in todo.items() if song_keys}
+
+    up_to_date = len(songs) * len(keys) - sum(len(song_keys) for song_keys in todo.values())
+
+
+    def record(song, printed, errors, elapsed):
+        nonlocal charts, busy_time
+        charts += len(printed)
+        busy_time += elapsed
+        failures.extend((song, key, error) for key, error in errors)
+        if one_file and printed:
+            record_chart(manifest, song, 'all keys', song_hashes[song], version, printed[0][1], master_path)
+        elif not one_file:
+            for key, path in printed:
+                record_chart(manifest, song, key, song_hashes[song], version, path, master_path)
+        print('%-50s %2d/%d keys  %6.2f s' % (song, len(printed), len(todo[song]), elapsed))
+
+
+    # the manifest is saved even if the batch is stopped part way, so the charts printed so far aren't printed again
+    try:
+
+        # one job prints everything right here (no pool to start up, and errors are easier to debug)
+        if jobs == 1:
+            if todo:
+                warm_worker()
+            for song, song_keys in todo.items():
+                record(*print_song(song, song_keys, one_file))
+
+        # otherwise each song is one task, so all of its keys go to the same worker
+        else:
+            with contextlib.ExitStack() as stack:
+                if pool is None:
+                    pool = stack.enter_context(concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=start_worker))
+                tasks = {pool.submit(print_song, song, song_keys, one_file): song for song, song_keys in todo.items()}
+
+                for task in concurrent.futures.as_completed(tasks):
+
+                    # if a worker dies (rather than a chart raising an error) count the whole song as failed
+                    try:
+                        record(*task.result())
+                    except Exception as error:
+                        song = tasks[task]
+                        record(song, [], [(key, type(error).__name__ + ': ' + str(error)) for key in todo[song]], 0)
+
+        # remove the charts of songs that aren't around anymore
+        removed = 0
+        if remove_deleted:
+            for song in set(manifest) - set(songs):
+                removed += remove_song(manifest, song, master_path)
+
+    finally:
+        save_manifest(manifest, manifest_path)
+
+    elapsed = time.perf_counter() - start
+
+
+    # throughput summary
+    print()
+    print('Printed %d of %d charts (%d songs x %d keys, %d already up to date) in %.2f s with %d job%s' %
+          (charts, len(songs) * len(keys), len(songs), len(keys), up_to_date, elapsed, jobs, '' if jobs == 1 else 's'))
+    print('%.1f charts/s, %.1f ms of worker time per chart printed' %
+          (charts / elapsed if elapsed else 0, 1000 * busy_time / max(charts, 1)))
+    if removed:
+        print('Removed %d charts of deleted songs' % removed)
+
+    if failures:
+        print()
+        print('%d charts failed:' % len(failures))
+        for song, key, error in failures:
+            print('    %s in %s: %s' % (song, key, error))
+
+
+    return(failures)
+
+
+
+###############################################################################
+
+# define a function to keep watching the song folder and print songs as they change
+
+def snapshot_songs():
+    ''' Modified time, size and inode of every song file (polled to spot songs that were added, edited or deleted). '''
+    songs = {}
+    with os.scandir(song_folder) as entries:
+        for entry in entries:
+            if entry.name.endswith('.txt') and entry.is_file():
+                stat = entry.stat()
+                songs[entry.name] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    return(songs)
+
+
+
+def watch_chord_charts(keys=all_keys, jobs=None, interval=1, debounce=2, one_file=False):
+
+    '''
+    Bring the charts up to date, then check the song folder every interval
+    seconds. Once a change has been seen and the folder has stopped changing
+    for debounce seconds (editors often save a file in a few steps), print
+    the songs that changed and remove the charts of deleted songs. Runs
+    until stopped with Ctrl+C.
+    '''
+
+    jobs = jobs or os.cpu_count() or 1
+
+    # start the workers once so the fonts, logo and parse caches stay loaded between changes
+    if jobs == 1:
+        pool = None
+        warm_worker()
+    else:
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=start_worker)
+
+    try:
+        snapshot = snapshot_songs()
+        batch_chord_charts(sorted(snapshot), keys, jobs=jobs, remove_deleted=True, pool=pool, one_file=one_file)
+
+        print()
+        print('Watching ' + song_folder + ' for changes (Ctrl+C to stop)')
+
+        while True:
+            time.sleep(interval)
+            current = snapshot_songs()
+            if current == snapshot:
+                continue
+
+            # wait for the burst of saves to finish
+            last_change = time.monotonic()
+            while time.monotonic() - last_change < debounce:
+                time.sleep(min(interval, debounce))
+                latest = snapshot_songs()
+                if latest != current:
+                    current = latest
+                    last_change = time.monotonic()
+
+            changed = sorted(song for song in current if current[song] != snapshot.get(song))
+            deleted = sorted(set(snapshot) - set(current))
+            snapshot = current
+
+            print()
+            print(time.strftime('%H:%M:%S') + ' - changed: ' + (', '.join(changed) or 'none') +
+                  '; deleted: ' + (', '.join(deleted) or 'none'))
+
+            # the manifest picks out the songs whose contents actually changed
+            batch_chord_charts(sorted(current), keys, jobs=jobs, remove_deleted=True, pool=pool, one_file=one_file)
+
+    except KeyboardInterrupt:
+        print()
+        print('Stopped watching')
+
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+
+###############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Print chord charts for many songs in every key')
+    parser.add_argument('songs', nargs='*', help='songs in the txt_input_files folder (default: all of them)')
+    parser.add_argument('--keys', nargs='+', default=all_keys, help='keys to print each song in (default: all 15)')
+    parser.add_argument('--jobs', type=int, default=None, help='number of worker processes (default: one per cpu)')
+    parser.add_argument('--force', action='store_true', help='print every chart, even the ones that are up to date')
+    parser.add_argument('--one-file', action='store_true', help='print each song as one PDF with a page for each key')
+    parser.add_argument('--timing', help='file to add a json record of the time taken by each stage of each chart to')
+    parser.add_argument('--profile', help='folder to save cProfile stats for each song in')
+    parser.add_argument('--watch', action='store_true', help='keep running and print songs as they change')
+    parser.add_argument('--interval', type=float, default=1, help='seconds between checks of the song folder in watch mode')
+    parser.add_argument('--debounce', type=float, default=2, help='seconds the song folder has to stop changing before printing')
+
+    args = parser.parse_args()
+
+    # (set before any workers are started, so they time and profile too)
+    if args.timing:
+        enable_timing(args.timing)
+    if args.profile:
+        enable_profiling(args.profile)
+
+    if args.watch:
+        watch_chord_charts(args.keys, jobs=args.jobs, interval=args.interval, debounce=args.debounce, one_file=args.one_file)
+        sys.exit(0)
+
+    # the charts of deleted songs are only removed when the whole folder is being printed
+    songs = args.songs or sorted(s for s in os.listdir(song_folder) if s.endswith('.txt'))
+
+    failures = batch_chord_charts(songs, args.keys, jobs=args.jobs, force=args.force, remove_deleted=not args.songs,
+                                  one_file=args.one_file)
+
+    sys.exit(1 if failures else 0)
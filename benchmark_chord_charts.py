@@ -0,0 +1,1373 @@
+# Benchmarks for the chord chart scripts
+
+# This file times pieces of the chord chart pipeline so that changes can be
+# checked for speed (and for giving the same output as before).
+
+# Usage: python benchmark_chord_charts.py replace_chords [song.txt ...]
+#        python benchmark_chord_charts.py classify [song.txt ...]
+#        python benchmark_chord_charts.py startup [--song song.txt] [--key A]
+#        python benchmark_chord_charts.py file_io [song.txt ...] [--one-file]
+#        python benchmark_chord_charts.py server [song.txt ...] [--requests 200] [--jobs 1]
+#        python benchmark_chord_charts.py stress [--song song.txt] [--threads 8] [--processes 4] [--rounds 4]
+#        python benchmark_chord_charts.py stages [song.txt ...] [--synthetic small medium large] [--json results.json] [--compare old.json]
+#        python benchmark_chord_charts.py layout [song.txt ...]
+#        python benchmark_chord_charts.py font_sizes [--lines 500]
+#        python benchmark_chord_charts.py string_width [song.txt ...]
+#        python benchmark_chord_charts.py pages [song.txt ...]
+#        python benchmark_chord_charts.py draw_sections [song.txt ...]
+#        python benchmark_chord_charts.py transpose_text [song.txt ...] [--synthetic-lines 100000]
+#        python benchmark_chord_charts.py timing_report timing.jsonl
+#        python benchmark_chord_charts.py memory [--songs 1000] [--keys A] [--budget-mb 16] [--growth-mb 2] [--real]
+
+
+
+
+# Importing Libraries
+import io
+import os
+import re
+import sys
+import json
+import random
+import time
+import tracemalloc
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+import contextlib
+import collections
+import http.client
+import urllib.parse
+import concurrent.futures
+
+from music_theory import transposition_table
+from chord_lines import replace_chords, parse_chord_line, render_chord_line, classify_line, transpose_text, transpose_lines
+
+
+# folder this file lives in (the sample song is stored next to it)
+repo_path = os.path.dirname(os.path.abspath(__file__))
+
+# the 15 keys we print every song in (all keys that don't require double sharps or flats)
+all_keys = ['C', 'F', 'Bb', 'Eb', 'Ab', 'Db', 'Gb', 'Cb', 'G', 'D', 'A', 'E', 'B', 'F#', 'C#']
+
+# songs to use if none are given
+default_songs = [os.path.join(repo_path, 'Mighty Cross chords - G.txt')]
+
+
+################################################################################
+
+# the original character by character version of replace_chords, kept here to benchmark against
+
+def legacy_replace_chords(string, chords_dict):
+
+    final_string = ''
+
+    spaces_to_remove = 0
+    spaces_to_add = 0
+
+    i = 0
+    while (i < len(string)):
+
+        if string[i] in {'A', 'B', 'C', 'D', 'E', 'F', 'G'}:
+
+            if i == len(string) - 1:
+                chord = string[i]
+            elif string[i + 1] == ' ':
+                chord = string[i]
+            elif string[i + 1] in {'#', 'b'}:
+                chord = string[i:i+2]
+            else:
+                chord = string[i]
+
+            try:
+                chord_replacement = chords_dict[chord]
+            except:
+                chord_replacement = 'NA'
+
+            if len(chord) < len(chord_replacement):
+                spaces_to_remove += 1
+            elif len(chord) > len(chord_replacement):
+                spaces_to_add += 1
+
+            final_string += chord_replacement
+            i += len(chord)
+
+        elif string[i] != ' ':
+            final_string += string[i]
+            i += 1
+
+        else:
+
+            if (spaces_to_add > 0) or (spaces_to_remove > 0):
+
+                if spaces_to_add == spaces_to_remove:
+                    final_string += string[i]
+                    i += 1
+                    spaces_to_add = 0
+                    spaces_to_remove = 0
+
+                elif spaces_to_add > spaces_to_remove:
+                    spaces_to_add = spaces_to_add - spaces_to_remove
+                    spaces_to_remove = 0
+
+                elif spaces_to_add < spaces_to_remove:
+                    spaces_to_remove = spaces_to_remove - spaces_to_add
+                    spaces_to_add = 0
+
+                if spaces_to_add > 0:
+                    final_string += ' ' * (spaces_to_add + 1)
+                    spaces_to_add = 0
+                    i += 1
+                if spaces_to_remove > 0:
+                    if string[i:i + spaces_to_remove + 1] == " " * (spaces_to_remove + 1):
+                        i += spaces_to_remove
+                        spaces_to_remove = 0
+                    else:
+                        final_string += string[i]
+                        i += 1
+            else:
+                final_string += string[i]
+                i += 1
+
+    return(final_string)
+
+
+# the original KMeans clustering of chord and lyric lines, kept here to compare the line classifier against
+# (sklearn is only needed for this benchmark, so it's imported here rather than at the top of the file)
+
+def kmeans_line_classes(lines):
+
+    import numpy as np
+    from sklearn.cluster import KMeans
+
+    # lines that aren't the title or a heading
+    other = [line for i, line in enumerate(lines) if i != 0 and '[' not in line]
+
+    nchar = np.array([len(''.join(line.split())) for line in other])
+    nspace = np.array([line.count(' ') for line in other])
+
+    cluster = KMeans(n_clusters=2, n_init=10).fit_predict(np.column_stack([nchar, nspace]))
+
+    # the cluster with the higher text to space ratio is the lyrics
+    ratio = nchar / nspace
+    lyrics_cluster = 0 if ratio[cluster == 0].mean() > ratio[cluster == 1].mean() else 1
+
+    return ['lyrics' if c == lyrics_cluster else 'chords' for c in cluster], other
+
+
+# the original font sizing (0.45 x the characters and spaces in a line, including the space added at the end
+# when a song is parsed), then a pass to shrink the line above each shrunk lyrics line, kept here to compare with
+
+def legacy_line_font_sizes(song):
+
+    from chart_layout import center_left_margin, left_margin, default_font_size
+
+    line_font_size = [default_font_size if (line.nspace + line.nchar) * default_font_size * 0.45 <= (center_left_margin - left_margin - 2*8)
+                      else (center_left_margin - left_margin - 2*8) / (0.45 * (line.nspace + line.nchar))
+                      for line in song.lines]
+
+    for i in range(len(song.lines)):
+        if (line_font_size[i] < default_font_size) and (song.lines[i].line_class == 'lyrics'):
+            line_font_size[i-1] = line_font_size[i]
+
+    return line_font_size
+
+
+# the original way of drawing the sections of a chart (every line setting its font and colours and drawing
+# a newline in 3pt type underneath it to space the lines out), kept here to compare with
+
+def legacy_draw_sections(canvas, song, layout, line_font_size, page=0):
+
+    for box in layout.boxes:
+        if box.page != page:
+            continue
+
+        if box.shaded:
+            canvas.setStrokeColorRGB(0,0,0)
+            canvas.setFillColorRGB(211/256, 211/256, 211/256)
+        else:
+            canvas.setStrokeColorRGB(0,0,0)
+            canvas.setFillColorRGB(1,1,1)
+
+        canvas.roundRect(box.x, box.y, box.width, box.height, radius = 10, stroke=1, fill=1)
+
+        for i, x, y in box.lines:
+            if song.lines[i].line_class == 'lyrics':
+                canvas.setFont('Inconsolata', line_font_size[i])
+                canvas.setStrokeColorRGB(0,0,0)
+                canvas.setFillColorRGB(0,0,0)
+            elif (song.lines[i].line_class == 'heading') or (song.lines[i].line_class == 'chords'):
+                canvas.setFont('InconsolataBold', line_font_size[i])
+                canvas.setStrokeColorRGB(0,0,0)
+                canvas.setFillColorRGB(0,0,0)
+
+            canvas.drawString(x = x, y = y, text = song.text2[i])
+
+            canvas.setFont('Inconsolata', 3)
+            canvas.drawString(x = x, y = y + 10, text = '\n')
+
+
+################################################################################
+
+# helpers for loading songs and making up synthetic ones
+
+def song_key(song_path):
+    ''' Get the current key of a song from its file name (e.g. "One of Us chords - B.txt"). '''
+    return os.path.basename(song_path).split(" ")[-1].split(".")[0]
+
+
+def corpus_lines(song_path):
+    ''' Read the non-empty lines of a song the same way read_song does. '''
+    with open(song_path, encoding='utf-8') as f:
+        return [line.strip('\n') + ' ' for line in f if line.strip('\n').strip()]
+
+
+def synthetic_chord_line(length, rng):
+    ''' Make up a line of chords (with accidentals, qualities and slash chords) of about the given length. '''
+    pieces = []
+    total = 0
+    while total < length:
+        chord = rng.choice('ABCDEFG') + rng.choice(['', '', '#', 'b']) + rng.choice(['', '', 'm', '7', 'maj7', 'sus4'])
+        if rng.random() < 0.2:
+            chord += '/' + rng.choice('ABCDEFG') + rng.choice(['', 'b', '#'])
+        pieces.append(chord + ' ' * rng.randint(1, 8))
+        total += len(pieces[-1])
+    return ''.join(pieces)[:length]
+
+
+# sections to cycle through in synthetic songs
+synthetic_sections = ['Verse 1', 'Pre-Chorus', 'Chorus', 'Verse 2', 'Chorus', 'Bridge', 'Chorus', 'Tag']
+synthetic_words = ['you', 'are', 'my', 'God', 'and', 'I', 'will', 'sing', 'of', 'your', 'love', 'forever', 'the', 'cross',
+                   'grace', 'over', 'all', 'mighty', 'to', 'save', 'hallelujah', 'praise', 'holy', 'name', 'light']
+
+
+def synthetic_song(rng, title='Synthetic Song', lines=60, sections=6, chord_density=3, accidentals=0.25, slash_chords=0.2,
+                   words=(5, 10)):
+
+    '''
+    Make up the text of a song in G: a title, then sections (headings in
+    brackets) holding lines lines of lyrics in total (of words[0] to
+    words[1] words each), each with a line of about chord_density chords
+    above it (none if chord_density is 0). Each chord's root has an
+    accidental with probability accidentals and a bass note with
+    probability slash_chords.
+    '''
+
+    def chord():
+        name = rng.choice('ABCDEFG') + (rng.choice('#b') if rng.random() < accidentals else '')
+        name += rng.choice(['', '', 'm', '7', 'maj7', 'sus4', 'm7', 'add9'])
+        if rng.random() < slash_chords:
+            name += '/' + rng.choice('ABCDEFG') + (rng.choice('#b') if rng.random() < accidentals else '')
+        return name
+
+    text = [title, '']
+    sections = max(1, min(sections, lines))
+    for section in range(sections):
+        text.append('[' + synthetic_sections[section % len(synthetic_sections)] + ']')
+
+        for _ in range(lines // sections + (section < lines % sections)):
+            lyrics = ' '.join(rng.choice(synthetic_words) for _ in range(rng.randint(*words)))
+
+            # spread the chords out over the lyrics, at least one space apart
+            if chord_density > 0:
+                chord_line = ''
+                for column in sorted(rng.sample(range(0, len(lyrics), 2), min(len(lyrics) // 2, max(1, round(rng.gauss(chord_density, 1)))))):
+                    chord_line += ' ' * max(column - len(chord_line), 1 if chord_line else 0) + chord()
+                text.append(chord_line)
+
+            text.append(lyrics)
+        text.append('')
+
+    return '\n'.join(text) + '\n'
+
+
+# sizes of synthetic songs for the stages benchmark
+synthetic_presets = {
+    'small': dict(lines=16, sections=3, chord_density=2, accidentals=0.1, slash_chords=0.1),
+    'medium': dict(lines=48, sections=6, chord_density=3, accidentals=0.25, slash_chords=0.2),
+    'large': dict(lines=160, sections=16, chord_density=5, accidentals=0.5, slash_chords=0.4),
+}
+
+
+def time_calls(function, calls, repeat):
+    ''' Best total time (in seconds) over repeat runs of function(*args) for every args in calls. '''
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for args in calls:
+            function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+################################################################################
+
+# benchmarks
+
+def benchmark_replace_chords(song_paths, line_length=10000, n_lines=20, repeat=5, seed=0):
+
+    '''
+    Time replace_chords against the original character by character version on
+    every line of the given songs in all 15 keys and on synthetic long chord
+    lines, checking that both versions give the same output. Also time
+    rendering lines that were parsed into key-neutral pieces ahead of time.
+    '''
+
+    rng = random.Random(seed)
+
+    # every line of every song (not just the chord lines) transposed into every key
+    corpus_jobs = [(line, song_key(song_path), key)
+                   for song_path in song_paths for line in corpus_lines(song_path) for key in all_keys]
+
+    # long made up chord lines going from G into a random key
+    synthetic_jobs = [(synthetic_chord_line(line_length, rng), 'G', rng.choice(all_keys)) for _ in range(n_lines)]
+
+    for name, jobs in [('corpus', corpus_jobs), ('synthetic %d char lines' % line_length, synthetic_jobs)]:
+
+        replace_calls = [(line, transposition_table[(current_key, desired_key)]) for line, current_key, desired_key in jobs]
+        render_calls = [(parse_chord_line(line, current_key), desired_key) for line, current_key, desired_key in jobs]
+
+        # make sure the outputs agree before timing anything
+        expected = [legacy_replace_chords(*args) for args in replace_calls]
+        mismatches = sum(replace_chords(*args) != output for args, output in zip(replace_calls, expected))
+        mismatches += sum(render_chord_line(*args) != output for args, output in zip(render_calls, expected))
+
+        legacy_time = time_calls(legacy_replace_chords, replace_calls, repeat)
+        new_time = time_calls(replace_chords, replace_calls, repeat)
+        render_time = time_calls(render_chord_line, render_calls, repeat)
+
+        print('%s: %d lines, %d mismatches' % (name, len(jobs), mismatches))
+        print('    legacy replace_chords:   %10.3f ms' % (legacy_time * 1000))
+        print('    replace_chords:          %10.3f ms  (%.2fx speedup)' % (new_time * 1000, legacy_time / new_time))
+        print('    render_chord_line:       %10.3f ms  (%.2fx speedup, lines parsed once beforehand)' % (render_time * 1000, legacy_time / render_time))
+
+
+def benchmark_layout(song_paths, repeat=5, seed=0):
+
+    '''
+    Time laying out a song in all 15 keys the way charts used to be laid
+    out (the whole layout again for every key) against working out the
+    key-independent layout once and only refitting the chord lines that
+    changed length in each key, next to a single layout pass. Also checks
+    both give the same font sizes in every key.
+    '''
+
+    from song_model import parse_song_text, render_song
+    from chart_layout import layout_song, song_layout, key_font_sizes
+    from build_chord_chart_function import font_dir
+    from chart_fonts import register_fonts
+
+    register_fonts(font_dir)
+    rng = random.Random(seed)
+
+    songs = []
+    for song_path in song_paths:
+        with open(song_path, 'rb') as f:
+            songs.append((os.path.basename(song_path)[:-len('.txt')], parse_song_text(f.read(), song_key(song_path))))
+    for preset in sorted(synthetic_presets):
+        songs.append(('synthetic ' + preset, parse_song_text(synthetic_song(rng, **synthetic_presets[preset]).encode(), 'G')))
+
+    print('ms to lay out a song in %d keys (best of %d)' % (len(all_keys), repeat))
+    print('    %-30s %12s %12s %12s %10s' % ('', 'every key', 'once+patch', 'one pass', 'speedup'))
+
+    for name, song in songs:
+        rendered = [render_song(song, key) for key in all_keys]
+
+        def every_key():
+            for key_song in rendered:
+                song.layout = layout_song(song)
+                key_font_sizes(key_song)
+
+        def once_and_patch():
+            song.layout = None
+            song_layout(song)
+            for key_song in rendered:
+                key_font_sizes(key_song)
+
+        def one_pass():
+            layout_song(song)
+
+        every_time = time_calls(every_key, [()], repeat)
+        cached_time = time_calls(once_and_patch, [()], repeat)
+        single_time = time_calls(one_pass, [()], repeat)
+
+        print('    %-30s %12.3f %12.3f %12.3f %9.1fx' % (name[:30], every_time * 1000, cached_time * 1000, single_time * 1000,
+                                                     every_time / cached_time))
+
+
+def benchmark_font_sizes(lines=500, repeat=5, seed=0):
+
+    '''
+    Time working out the font size of every line of a synthetic song with
+    lines lines of lyrics, most of them too long for a column at the
+    default size, with line_font_sizes against the original version. Then
+    measure every line with reportlab at the size it was given, to check
+    that none of them overflows the column and that every shrunk line
+    fills it exactly (the original overcounted each line by the space added
+    at the end, so shrunk lines came out a little smaller than needed).
+    '''
+
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from build_chord_chart_function import font_dir
+    from chart_fonts import register_fonts
+    from chart_layout import line_font_sizes, text_width, default_font_size
+    from song_model import parse_song_text
+
+    register_fonts(font_dir)
+    rng = random.Random(seed)
+    song = parse_song_text(synthetic_song(rng, lines=lines, sections=max(1, lines // 20), chord_density=8, words=(6, 24)).encode(), 'G')
+
+    # (the sample song too, where like most songs nearly every line fits at the default size)
+    with open(default_songs[0], 'rb') as f:
+        sample = parse_song_text(f.read(), song_key(default_songs[0]))
+
+    for timed_song in [song, sample]:
+        legacy_time = time_calls(legacy_line_font_sizes, [(timed_song,)] * 100, repeat) / 100
+        new_time = time_calls(line_font_sizes, [(timed_song,)] * 100, repeat) / 100
+
+        print('%d lines (%d of them longer than a column at %dpt)' % (len(timed_song.lines), sum(len(line.text.rstrip()) * 0.45 * default_font_size > text_width
+                                                                                       for line in timed_song.lines), default_font_size))
+        print('    legacy line font sizes:  %10.3f ms' % (legacy_time * 1000))
+        print('    line_font_sizes:         %10.3f ms  (%.2fx speedup)' % (new_time * 1000, legacy_time / new_time))
+
+    # how wide each line comes out, measured with the font itself
+    for name, sizes in [('legacy', legacy_line_font_sizes(song)), ('line_font_sizes', line_font_sizes(song))]:
+        widths = [stringWidth(line.text.rstrip(), 'InconsolataBold' if line.line_class != 'lyrics' else 'Inconsolata', size)
+                  for line, size in zip(song.lines, sizes)]
+        fitted = [width for width, size, line in zip(widths, sizes, song.lines) if size < default_font_size]
+        print('    %-16s widest line %8.3f pt (column %.1f pt), shrunk lines fill %6.2f%% to %6.2f%% of the column' %
+              (name + ':', max(widths), text_width, 100 * min(fitted) / text_width, 100 * max(fitted) / text_width))
+
+
+def benchmark_string_width(song_paths, repeat=5, seed=0):
+
+    '''
+    Time measuring every line of the given songs and a synthetic song, plus
+    lines with characters that aren't the usual width (accents, flats and
+    sharps, tabs, characters the font doesn't have), in both fonts with
+    string_width against reportlab's stringWidth, checking they agree.
+    '''
+
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from build_chord_chart_function import font_dir
+    from chart_fonts import register_fonts, string_width
+
+    register_fonts(font_dir)
+    rng = random.Random(seed)
+
+    lines = [line for song_path in song_paths for line in corpus_lines(song_path)]
+    lines += [line + ' ' for line in synthetic_song(rng, **synthetic_presets['large']).splitlines() if line.strip()]
+    mixed = [line.replace('b', '\u266d').replace('#', '\u266f').replace('e', rng.choice(['\u00e9', 'e\u0301'])).replace('  ', '\t ', 1)
+             + rng.choice(['', '\u4e00', '\u2014'])
+             for line in lines]
+
+    for name, texts in [('plain lines', lines), ('lines with other characters', mixed)]:
+        calls = [(text, font, 10) for text in texts for font in ['Inconsolata', 'InconsolataBold']]
+        mismatches = sum(string_width(*args) != stringWidth(*args) for args in calls)
+
+        reportlab_time = time_calls(stringWidth, calls, repeat)
+        table_time = time_calls(string_width, calls, repeat)
+
+        print('%s: %d strings, %d mismatches' % (name, len(calls), mismatches))
+        print('    stringWidth (reportlab): %10.3f ms' % (reportlab_time * 1000))
+        print('    string_width:            %10.3f ms  (%.2fx speedup)' % (table_time * 1000, reportlab_time / table_time))
+
+
+def benchmark_pages(song_paths, repeat=5, seed=0):
+
+    '''
+    Pack the given songs and synthetic songs from one to many pages long
+    (one with a section too long for a column) into columns and pages,
+    timing the packing (once, and again for every key the way a batch
+    would if it packed each key) and checking that every rectangle is
+    inside its column without overlapping the one above, that the lines
+    come out in song order, how the page count compares with the fewest
+    pages the song's height could possibly fit in, and that the chart has
+    that many pages.
+    '''
+
+    from song_model import parse_song_text, render_song
+    from chart_layout import print_paragraphs, pack_paragraphs, song_layout, box_height, box_gap, column_top, column_bottom
+    from build_chord_chart_function import font_dir, render_chord_chart
+    from chart_fonts import register_fonts
+
+    register_fonts(font_dir)
+    rng = random.Random(seed)
+
+    songs = []
+    for song_path in song_paths:
+        with open(song_path, 'rb') as f:
+            songs.append((os.path.basename(song_path)[:-len('.txt')], parse_song_text(f.read(), song_key(song_path))))
+    for lines, sections in [(50, 6), (100, 8), (300, 20), (1000, 60), (200, 2)]:
+        songs.append(('synthetic %d lines/%d sections' % (lines, sections),
+                      parse_song_text(synthetic_song(rng, lines=lines, sections=sections).encode(), 'G')))
+
+    print('ms to pack a song into pages (best of %d)' % repeat)
+    print('    %-32s %6s %6s %6s %10s %12s %8s' % ('', 'pages', 'split', 'pdf', 'pack', 'pack x %d' % len(all_keys), 'problems'))
+
+    failed = False
+    for name, song in songs:
+        paragraphs = print_paragraphs(song)
+        boxes, pages = pack_paragraphs(song, paragraphs)
+
+        pack_time = time_calls(pack_paragraphs, [(song, paragraphs)], repeat)
+        every_key_time = time_calls(pack_paragraphs, [(song, paragraphs)] * len(all_keys), repeat)
+
+        # rectangles inside their columns and below the one above them, and the lines in order
+        problems = 0
+        above = {}
+        for box in sorted(boxes, key=lambda box: (box.page, box.x, box.y)):
+            problems += box.y < above.get((box.page, box.x), column_top) or box.y + box.height > column_bottom
+            above[(box.page, box.x)] = box.y + box.height + box_gap
+        problems += [i for box in sorted(boxes, key=lambda box: (box.page, box.x, box.y)) for i, x, y in box.lines] != \
+                    [i for paragraph in paragraphs for i in paragraph]
+
+        # the fewest pages the rectangles could fit in if they could be split anywhere (they're only split when too long for a column)
+        total_height = sum(box_height(len(paragraph)) + box_gap for paragraph in paragraphs if paragraph)
+        fewest = -(-total_height // (2 * (column_bottom - column_top + box_gap)))
+
+        pdf = render_chord_chart(render_song(song, 'A'))
+        pdf_pages = len(re.findall(rb'/Type /Page\b(?!s)', pdf))
+        problems += pdf_pages != song_layout(song).pages
+
+        failed = failed or problems > 0
+        print('    %-32s %6d %6d %6d %10.3f %12.3f %8d' % (name[:32], pages, fewest, pdf_pages, pack_time * 1000,
+                                                        every_key_time * 1000, problems))
+
+
+    return(not failed)
+
+
+def benchmark_draw_sections(song_paths, repeat=5, seed=0):
+
+    '''
+    Draw the sections of the given songs and synthetic songs in all 15 keys
+    with draw_sections (one text object per section) against the original
+    line by line drawing, comparing the size of the page content (before
+    compression), the number of text objects and font changes in it, and
+    the time taken.
+    '''
+
+    from reportlab.pdfgen.canvas import Canvas
+    from reportlab.lib.pagesizes import LETTER
+    from song_model import parse_song_text, render_song
+    from chart_layout import song_layout, key_font_sizes
+    from build_chord_chart_function import font_dir, draw_sections
+    from chart_fonts import register_fonts
+
+    register_fonts(font_dir)
+    rng = random.Random(seed)
+
+    songs = []
+    for song_path in song_paths:
+        with open(song_path, 'rb') as f:
+            songs.append((os.path.basename(song_path)[:-len('.txt')], parse_song_text(f.read(), song_key(song_path))))
+    for preset in sorted(synthetic_presets):
+        songs.append(('synthetic ' + preset, parse_song_text(synthetic_song(rng, **synthetic_presets[preset]).encode(), 'G')))
+
+    def draw(function, keys):
+        ''' Draw the sections of every page of every key on its own canvas and return the content of each page. '''
+        content = []
+        for song, line_font_size in keys:
+            for page in range(song_layout(song.song).pages):
+                canvas = Canvas(io.BytesIO(), pagesize = LETTER, bottomup=False)
+                function(canvas, song, song_layout(song.song), line_font_size, page)
+                content.append(' '.join(canvas._code))
+        return content
+
+    print('drawing the sections of a song in %d keys (content before compression, best of %d)' % (len(all_keys), repeat))
+    print('    %-24s %-16s %12s %10s %10s %10s' % ('', '', 'content', 'BT', 'Tf', 'ms'))
+
+    for name, song in songs:
+        keys = [(key_song, key_font_sizes(key_song)) for key_song in [render_song(song, key) for key in all_keys]]
+
+        for label, function in [('line by line', legacy_draw_sections), ('draw_sections', draw_sections)]:
+            content = draw(function, keys)
+            draw_time = time_calls(draw, [(function, keys)], repeat)
+            print('    %-24s %-16s %12d %10d %10d %10.3f' % (name[:24], label, sum(len(page) for page in content),
+                                                         sum(len(re.findall(r'\bBT\b', page)) for page in content),
+                                                         sum(len(re.findall(r'\bTf\b', page)) for page in content), draw_time * 1000))
+
+
+def benchmark_transpose_text(song_paths, synthetic_lines=100000, repeat=5, seed=0):
+
+    '''
+    Time transposing the text of songs into all 15 keys with transpose_text
+    against parsing each song and rendering it (the way a chart gets its
+    text), checking both give the same lines, and time streaming a long
+    synthetic song through transpose_lines. Reports lines per second.
+    '''
+
+    from song_model import parse_song_text, render_song
+
+    rng = random.Random(seed)
+
+    songs = []
+    for song_path in song_paths:
+        with open(song_path, encoding='utf-8') as f:
+            songs.append((f.read(), song_key(song_path)))
+    songs.append((synthetic_song(rng, **synthetic_presets['medium']), 'G'))
+
+    calls = [(text, current_key, key) for text, current_key in songs for key in all_keys]
+    lines = sum(len(text.splitlines()) for text, _, _ in calls)
+
+    def parse_and_render(text, current_key, key):
+        return render_song(parse_song_text(text.encode('utf-8'), current_key), key).text2
+
+    # make sure both give the same lines (text2 has no blank lines and a space on the end of each line)
+    mismatches = sum([line.rstrip(' ') for line in transpose_text(*args).splitlines() if line.strip()] !=
+                     [line.rstrip(' ') for line in parse_and_render(*args)] for args in calls)
+
+    text_time = time_calls(transpose_text, calls, repeat)
+    parse_time = time_calls(parse_and_render, calls, repeat)
+
+    print('%d songs x %d keys: %d lines, %d mismatches' % (len(songs), len(all_keys), lines, mismatches))
+    print('    transpose_text:          %10.3f ms  %12.0f lines/s  %6.2f us/line' % (text_time * 1000, lines / text_time, text_time / lines * 1e6))
+    print('    parse_song + render:     %10.3f ms  %12.0f lines/s  %6.2f us/line' % (parse_time * 1000, lines / parse_time, parse_time / lines * 1e6))
+
+    # a long song streamed through one line at a time (as from a file or a pipe)
+    text = synthetic_song(rng, lines=synthetic_lines, sections=max(1, synthetic_lines // 8))
+    stream_lines = len(text.splitlines())
+
+    def stream(text, current_key, key):
+        for _ in transpose_lines(io.StringIO(text), current_key, key):
+            pass
+
+    stream_time = time_calls(stream, [(text, 'G', 'Bb')], repeat)
+
+    print('synthetic song streamed with transpose_lines: %d lines' % stream_lines)
+    print('    transpose_lines:         %10.3f ms  %12.0f lines/s  %6.2f us/line' % (stream_time * 1000, stream_lines / stream_time, stream_time / stream_lines * 1e6))
+
+
+def benchmark_classify(song_paths, repeat=5):
+
+    '''
+    Check that classify_line gives the same chord/lyric labels as the original
+    KMeans clustering on the given songs, and time both.
+    '''
+
+    songs = [corpus_lines(song_path) for song_path in song_paths]
+
+    mismatches = 0
+    total = 0
+    for song_path, lines in zip(song_paths, songs):
+        kmeans_classes, other = kmeans_line_classes(lines)
+        for line, expected in zip(other, kmeans_classes):
+            total += 1
+            if classify_line(line) != expected:
+                mismatches += 1
+                print('    %s: %r is %s with KMeans' % (os.path.basename(song_path), line, expected))
+
+    kmeans_time = time_calls(kmeans_line_classes, [(lines,) for lines in songs], repeat)
+    classify_time = time_calls(lambda lines: [classify_line(line) for line in lines], [(lines,) for lines in songs], repeat)
+
+    print('%d songs, %d lines, %d mismatches' % (len(songs), total, mismatches))
+    print('    KMeans:        %10.3f ms' % (kmeans_time * 1000))
+    print('    classify_line: %10.3f ms  (%.0fx speedup)' % (classify_time * 1000, kmeans_time / classify_time))
+
+
+# script run in a fresh interpreter for the startup benchmark (prints import time and render time)
+startup_script = '''
+import sys, time
+start = time.perf_counter()
+from build_chord_chart_function import build_chord_chart
+imported = time.perf_counter()
+build_chord_chart(sys.argv[1], sys.argv[2])
+print(imported - start, time.perf_counter() - imported)
+'''
+
+
+def benchmark_startup(song, key, runs=5):
+
+    '''
+    Time printing one chart from a cold interpreter (the way create_one_song
+    is used), split into starting python, importing and printing the PDF.
+    '''
+
+    totals, imports, renders = [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', startup_script, song, key], cwd=repo_path,
+                                capture_output=True, text=True, check=True)
+        totals.append(time.perf_counter() - start)
+
+        import_time, render_time = result.stdout.split('\n')[-2].split()
+        imports.append(float(import_time))
+        renders.append(float(render_time))
+
+    print('%s in %s, median of %d cold runs' % (song, key, runs))
+    print('    total (python start to first PDF): %8.1f ms' % (statistics.median(totals) * 1000))
+    print('    import build_chord_chart_function: %8.1f ms' % (statistics.median(imports) * 1000))
+    print('    build_chord_chart:                 %8.1f ms' % (statistics.median(renders) * 1000))
+
+
+def read_proc_io():
+    ''' Read/write syscall and byte counts for this process (Linux only, empty otherwise). '''
+    try:
+        with open('/proc/self/io') as f:
+            return {name: int(value) for name, value in (line.split(': ') for line in f)}
+    except OSError:
+        return {}
+
+
+# file operations seen by the audit hook while a benchmark is counting them
+file_operations = collections.Counter()
+counting_file_operations = [False]
+
+
+def count_file_operations(event, args):
+    if counting_file_operations[0]:
+        if event == 'open':
+            path, mode, flags = args
+            writing = ('w' in mode or 'a' in mode or '+' in mode) if mode else bool(flags & (os.O_WRONLY | os.O_RDWR))
+            file_operations['opens for writing' if writing else 'opens for reading'] += 1
+        elif event in ('os.remove', 'os.rename', 'os.replace'):
+            file_operations[event] += 1
+
+
+def benchmark_file_io(songs, keys=all_keys, one_file=False):
+
+    '''
+    Print every song in every key with build_chord_charts and count the file
+    operations (opens, removes, renames) and read/write syscalls and bytes it
+    takes. One chart is printed first so that one-off work (imports, fonts,
+    logo) isn't counted. With one_file, each song is printed as one PDF with
+    a page for each key (build_chord_chart_book) instead.
+    '''
+
+    from build_chord_chart_function import build_chord_charts, build_chord_chart_book
+
+    sys.addaudithook(count_file_operations)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        build_chord_charts(songs[0], keys[:1])
+
+        file_operations.clear()
+        counting_file_operations[0] = True
+        before = read_proc_io()
+        start = time.perf_counter()
+
+        for song in songs:
+            if one_file:
+                build_chord_chart_book(song, keys)
+            else:
+                build_chord_charts(song, keys)
+
+        elapsed = time.perf_counter() - start
+        after = read_proc_io()
+        counting_file_operations[0] = False
+
+    charts = len(songs) * len(keys)
+    print('%d songs x %d keys = %d charts in %.2f s' % (len(songs), len(keys), charts, elapsed))
+    print('    %-20s %12s %12s' % ('', 'total', 'per chart'))
+    for name in ['opens for reading', 'opens for writing', 'os.remove', 'os.rename', 'os.replace']:
+        print('    %-20s %12d %12.1f' % (name, file_operations[name], file_operations[name] / charts))
+    for name, label in [('syscr', 'read syscalls'), ('syscw', 'write syscalls'), ('rchar', 'bytes read'), ('wchar', 'bytes written')]:
+        if name in after:
+            print('    %-20s %12d %12.1f' % (label, after[name] - before[name], (after[name] - before[name]) / charts))
+
+
+def percentile(values, p):
+    ''' The p-th percentile of values (nearest rank). '''
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, int(round(p / 100 * len(values) + 0.5)) - 1))]
+
+
+def get_chart(port, song, key):
+    ''' Ask the chart server for a song in a key. Returns the seconds taken and the X-Chart-Cache header. '''
+    start = time.perf_counter()
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    connection.request('GET', '/chart?' + urllib.parse.urlencode({'song': song, 'key': key}))
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    if response.status != 200 or not body.startswith(b'%PDF'):
+        raise RuntimeError('%s in %s: %d %s' % (song, key, response.status, body[:200]))
+    return time.perf_counter() - start, response.getheader('X-Chart-Cache')
+
+
+def benchmark_server(songs, port=8765, requests=200, jobs=1, concurrent_requests=8, seed=0):
+
+    '''
+    Start chord_chart_server and time requests to it: cold requests (every
+    song in every key, each drawn for the first time), warm requests (random
+    charts that are already cached), and a burst of concurrent requests for
+    one chart that isn't cached (which should only be drawn once).
+    '''
+
+    server = subprocess.Popen([sys.executable, 'chord_chart_server.py', '--host', '127.0.0.1', '--port', str(port),
+                               '--jobs', str(jobs)], cwd=repo_path, stdout=subprocess.DEVNULL)
+    try:
+        # wait for the server to start listening
+        deadline = time.time() + 30
+        while True:
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+                connection.request('GET', '/stats')
+                connection.getresponse().read()
+                connection.close()
+                break
+            except OSError:
+                if time.time() > deadline or server.poll() is not None:
+                    raise RuntimeError('chord_chart_server.py did not start')
+                time.sleep(0.1)
+
+        # a burst of identical requests for a chart that hasn't been drawn (a key we don't usually print)
+        with concurrent.futures.ThreadPoolExecutor(concurrent_requests) as pool:
+            burst = list(pool.map(lambda _: get_chart(port, songs[0], 'G#'), range(concurrent_requests)))
+
+        cold = [get_chart(port, song, key) for song in songs for key in all_keys]
+
+        rng = random.Random(seed)
+        warm = [get_chart(port, rng.choice(songs), rng.choice(all_keys)) for _ in range(requests)]
+
+    finally:
+        server.terminate()
+        server.wait()
+
+    print('chord_chart_server with %d job%s, %d songs' % (jobs, '' if jobs == 1 else 's', len(songs)))
+    print('    %-34s %6s %9s %9s %9s' % ('', 'n', 'p50 ms', 'p99 ms', 'max ms'))
+    for name, results in [('cold (drawn on request)', cold), ('warm (from the cache)', warm),
+                          ('%d at once for one new chart' % concurrent_requests, burst)]:
+        times = [t for t, _ in results]
+        print('    %-34s %6d %9.2f %9.2f %9.2f' % (name, len(times), 1000 * percentile(times, 50),
+                                                   1000 * percentile(times, 99), 1000 * max(times)))
+
+    served = collections.Counter(cache for _, cache in burst)
+    print('    the %d concurrent requests were served as: %s' %
+          (concurrent_requests, ', '.join('%d %s' % (n, cache) for cache, n in sorted(served.items()))))
+    print('    cold requests not drawn: %d, warm requests not served from the cache: %d' %
+          (sum(cache != 'miss' for _, cache in cold), sum(cache != 'hit' for _, cache in warm)))
+
+
+def normalize_pdf(pdf):
+    ''' The contents of a PDF without the parts that change every time it's made (the dates and document id). '''
+    return re.sub(rb'\(D:[0-9]{14}[^)]*\)|\[<[0-9a-f]{32}><[0-9a-f]{32}>\]', b'', pdf)
+
+
+def stress_print(song, keys, output_dir):
+    ''' Print a song in each of the keys into output_dir (run in the stress test threads and processes). '''
+    from build_chord_chart_function import build_chord_charts
+    return build_chord_charts(song, keys, output_dir=output_dir)
+
+
+def benchmark_stress(song, threads=8, processes=4, rounds=4, seed=0):
+
+    '''
+    Print the same song in every key into the same folder from many threads
+    and then many processes at once, while another thread keeps reading the
+    charts. Checks that no read ever saw a half written chart, that every
+    chart ends up the same as when it's printed on its own, that no
+    temporary files are left behind and that the working directory didn't
+    change. Returns True if every check passed.
+    '''
+
+    rng = random.Random(seed)
+    working_directory = os.getcwd()
+    passed = True
+
+    with tempfile.TemporaryDirectory() as reference_dir, tempfile.TemporaryDirectory() as output_dir:
+
+        # the charts printed one at a time, to check against
+        reference = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            reference_paths = stress_print(song, all_keys, reference_dir)
+        for path in reference_paths:
+            with open(path, 'rb') as f:
+                reference[os.path.basename(path)] = normalize_pdf(f.read())
+
+        for name, pool_class, workers in [('threads', concurrent.futures.ThreadPoolExecutor, threads),
+                                          ('processes', concurrent.futures.ProcessPoolExecutor, processes)]:
+
+            # keep reading every chart in the folder while they're being written
+            stop_reading = threading.Event()
+            reads = collections.Counter()
+
+            def read_charts():
+                while not stop_reading.is_set():
+                    for folder, _, files in os.walk(output_dir):
+                        for file in files:
+                            if file.endswith('.pdf'):
+                                try:
+                                    with open(os.path.join(folder, file), 'rb') as f:
+                                        pdf = f.read()
+                                except FileNotFoundError:
+                                    continue
+                                reads['whole' if pdf.startswith(b'%PDF') and pdf.rstrip().endswith(b'%%EOF') else 'torn'] += 1
+
+            reader = threading.Thread(target=read_charts)
+            reader.start()
+
+            # every worker prints the song in every key (in its own order), rounds times over
+            start = time.perf_counter()
+            errors = []
+            # (the "Success" messages are sent to a buffer here, once for all the threads, since
+            # redirecting stdout inside each thread would swap sys.stdout under the other threads)
+            with contextlib.redirect_stdout(io.StringIO()), pool_class(workers) as pool:
+                tasks = [pool.submit(stress_print, song, rng.sample(all_keys, len(all_keys)), output_dir)
+                         for _ in range(workers * rounds)]
+                for task in tasks:
+                    try:
+                        task.result()
+                    except Exception as error:
+                        errors.append(type(error).__name__ + ': ' + str(error))
+            elapsed = time.perf_counter() - start
+
+            stop_reading.set()
+            reader.join()
+
+            # check what ended up in the folder
+            charts = {}
+            leftovers = []
+            for folder, _, files in os.walk(output_dir):
+                for file in files:
+                    if file.endswith('.pdf'):
+                        with open(os.path.join(folder, file), 'rb') as f:
+                            charts[file] = normalize_pdf(f.read())
+                    else:
+                        leftovers.append(file)
+
+            different = sorted(file for file in reference if charts.get(file) != reference[file])
+            checks = [('errors', errors), ('charts missing or different', different), ('temporary files left', leftovers),
+                      ('torn reads', ['x'] * reads['torn']),
+                      ('working directory changed', [os.getcwd()] if os.getcwd() != working_directory else [])]
+
+            print('%d %s x %d rounds x %d keys = %d charts into one folder in %.2f s (%d reads while writing)' %
+                  (workers, name, rounds, len(all_keys), workers * rounds * len(all_keys), elapsed, sum(reads.values())))
+            for check, failures in checks:
+                print('    %-28s %s' % (check + ':', len(failures) if failures else 'none'))
+                for failure in failures[:5]:
+                    print('        ' + str(failure))
+                passed = passed and not failures
+
+    print('PASSED' if passed else 'FAILED')
+    return passed
+
+
+# the stages of printing a chart, in order
+stage_names = ['read', 'classify', 'parse', 'transpose', 'layout', 'draw', 'watermark', 'save', 'write']
+
+
+def time_stages(song_path, output_dir, repeat=3):
+
+    '''
+    Print a song in all 15 keys repeat times, timing each stage of every
+    chart separately: reading the file, classifying its lines, parsing it
+    (which includes classifying), transposing it, laying it out (the whole
+    layout for the first key, then only the font sizes of the chord lines
+    that changed), drawing the chart, drawing the logo, saving the PDF into
+    memory and writing it to a file. Charts of more than one page count
+    every page. Returns {stage: list of seconds, one per chart}.
+    '''
+
+    from reportlab.pdfgen.canvas import Canvas
+    from reportlab.lib.pagesizes import LETTER
+    from build_chord_chart_function import font_dir, logo_path, draw_chord_chart, draw_logo, release_logo, write_pdf
+    from chart_layout import song_layout, key_font_sizes
+    from chart_fonts import register_fonts
+    from song_model import parse_song_text, render_song
+
+    register_fonts(font_dir)
+    current_key = song_key(song_path)
+    pdf_path = os.path.join(output_dir, 'chart.pdf')
+    times = {stage: [] for stage in stage_names}
+
+    # the lines classify_line is used on (not the title or headings)
+    lines = corpus_lines(song_path)
+    lines = [line for line in lines[1:] if '[' not in line]
+
+    for run in range(repeat + 1):
+
+        # each key is drawn from the same parsed song (as build_chord_charts does) so the layout is shared
+        run_song = None
+
+        for key in all_keys:
+            chart_times = dict.fromkeys(stage_names, 0)
+            clock = [time.perf_counter()]
+
+            def mark(stage):
+                ''' Count the time since the last mark towards a stage of this chart. '''
+                now = time.perf_counter()
+                chart_times[stage] += now - clock[0]
+                clock[0] = now
+
+            with open(song_path, 'rb') as f:
+                song_bytes = f.read()
+            mark('read')
+
+            for line in lines:
+                classify_line(line)
+            mark('classify')
+
+            song = parse_song_text(song_bytes, current_key)
+            run_song = run_song or song
+            mark('parse')
+
+            rendered = render_song(run_song, key)
+            mark('transpose')
+
+            song_layout(run_song)
+            key_font_sizes(rendered)
+            mark('layout')
+
+            # every page of the chart, each with the logo (ending a page counts towards saving)
+            pdf_buffer = io.BytesIO()
+            canvas = Canvas(pdf_buffer, pagesize = LETTER, bottomup=False)
+            for page in range(song_layout(run_song).pages):
+                draw_chord_chart(canvas, rendered, font_dir, page)
+                mark('draw')
+
+                draw_logo(canvas, logo_path)
+                mark('watermark')
+
+                canvas.showPage()
+                mark('save')
+
+            canvas.save()
+            release_logo(canvas, logo_path)
+            mark('save')
+
+            write_pdf(pdf_path, pdf_buffer.getvalue())
+            mark('write')
+
+            # the first run warms up the fonts, logo and imports
+            if run > 0:
+                for stage in stage_names:
+                    times[stage].append(chart_times[stage])
+
+    return times
+
+
+def git_commit():
+    ''' The commit the code is at (with "+changes" if there are uncommitted changes), or None outside git. '''
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo_path, capture_output=True, text=True, check=True).stdout.strip()
+        changes = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repo_path, capture_output=True, text=True).stdout.strip()
+        return commit + ('+changes' if changes else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_stages(song_paths, synthetic=('small', 'medium', 'large'), custom=None, repeat=3, json_path=None, compare_path=None, seed=0):
+
+    '''
+    Time every stage of printing a chart for the given songs and synthetic
+    songs (presets from synthetic_presets, plus a custom one if custom holds
+    synthetic_song arguments). Prints the median time per chart of each
+    stage, and writes the results to json_path and/or compares them with
+    the results of an earlier run in compare_path.
+    '''
+
+    rng = random.Random(seed)
+    results = {'benchmark': 'stages', 'commit': git_commit(), 'python': platform.python_version(),
+               'platform': platform.platform(), 'repeat': repeat, 'keys': len(all_keys), 'songs': {}}
+
+    with tempfile.TemporaryDirectory() as folder:
+
+        # write out the synthetic songs
+        songs = [(os.path.basename(song_path)[:-len('.txt')], song_path) for song_path in song_paths]
+        for name, options in [(preset, synthetic_presets[preset]) for preset in synthetic] + ([('custom', custom)] if custom else []):
+            song_path = os.path.join(folder, 'Synthetic ' + name + ' chords - G.txt')
+            with open(song_path, 'w', encoding='utf-8') as f:
+                f.write(synthetic_song(rng, title='Synthetic ' + name, **options))
+            songs.append(('synthetic ' + name, song_path))
+
+        for name, song_path in songs:
+            times = time_stages(song_path, folder, repeat)
+            lines = corpus_lines(song_path)
+            results['songs'][name] = {
+                'lines': len(lines),
+                'chord_lines': sum(classify_line(line) == 'chords' for line in lines[1:] if '[' not in line),
+                'charts': len(times['read']),
+                'stages': {stage: {'median_ms': 1000 * statistics.median(stage_times), 'best_ms': 1000 * min(stage_times)}
+                           for stage, stage_times in times.items()},
+                'total_median_ms': 1000 * statistics.median(map(sum, zip(*times.values()))),
+            }
+
+    # median ms per chart of each stage, one column per song
+    names = list(results['songs'])
+    print('median ms per chart (%d keys x %d runs), commit %s' % (len(all_keys), repeat, results['commit']))
+    print('    %-12s' % '' + ''.join('%18s' % name[:17] for name in names))
+    print('    %-12s' % 'lines' + ''.join('%18d' % results['songs'][name]['lines'] for name in names))
+    for stage in stage_names:
+        print('    %-12s' % stage + ''.join('%18.3f' % results['songs'][name]['stages'][stage]['median_ms'] for name in names))
+    print('    %-12s' % 'total' + ''.join('%18.3f' % results['songs'][name]['total_median_ms'] for name in names))
+
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(results, f, indent=1)
+        print('results written to ' + json_path)
+
+    # ratio of this run to the earlier one for each stage (above 1 means slower now)
+    if compare_path:
+        with open(compare_path) as f:
+            old = json.load(f)
+        print()
+        print('compared with commit %s (new / old median, above 1 is slower)' % old.get('commit'))
+        common = [name for name in names if name in old['songs']]
+        print('    %-12s' % '' + ''.join('%18s' % name[:17] for name in common))
+        for stage in stage_names + ['total']:
+            ratios = []
+            for name in common:
+                if stage == 'total':
+                    new_ms, old_ms = results['songs'][name]['total_median_ms'], old['songs'][name]['total_median_ms']
+                else:
+                    new_ms = results['songs'][name]['stages'][stage]['median_ms']
+                    old_ms = old['songs'][name]['stages'].get(stage, {}).get('median_ms')
+                ratios.append('%18s' % ('%.2fx' % (new_ms / old_ms) if old_ms else '-'))
+            print('    %-12s' % stage + ''.join(ratios))
+
+    return results
+
+
+def timing_report(timing_path, slowest=5):
+
+    '''
+    Summarise a file of timing records (from CHORD_CHART_TIMING or
+    batch_chord_charts --timing): where the time went, stage by stage, and
+    the slowest charts.
+    '''
+
+    with open(timing_path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+
+    for kind in ['song', 'chart']:
+        kind_records = [record for record in records if record['record'] == kind]
+        if not kind_records:
+            continue
+
+        total = sum(record['total_ms'] for record in kind_records)
+        stages = collections.defaultdict(list)
+        for record in kind_records:
+            for stage, ms in record['stages'].items():
+                stages[stage].append(ms)
+
+        print('%d %s records, %.1f ms in total' % (len(kind_records), kind, total))
+        print('    %-12s %10s %8s %10s %10s' % ('stage', 'total ms', 'share', 'median ms', 'max ms'))
+        for stage, times in stages.items():
+            print('    %-12s %10.1f %7.1f%% %10.3f %10.3f' % (stage, sum(times), 100 * sum(times) / total if total else 0,
+                                                          statistics.median(times), max(times)))
+
+    charts = sorted((record for record in records if record['record'] == 'chart'), key=lambda record: -record['total_ms'])
+    if charts:
+        print('    %d bytes written, %.0f bytes per chart' % (sum(record.get('bytes', 0) for record in charts),
+                                                             statistics.mean(record.get('bytes', 0) for record in charts)))
+        print('slowest charts:')
+        for record in charts[:slowest]:
+            print('    %8.1f ms  %s in %s (%d lines, %d chords)' % (record['total_ms'], record['song'], record['key'],
+                                                                record.get('lines', 0), record.get('chords', 0)))
+
+
+def peak_rss_mb():
+    ''' Peak resident memory of this process so far in MB (ru_maxrss is in bytes on macOS and KB on Linux). '''
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def benchmark_memory(songs=1000, keys=('A',), budget_mb=16, growth_mb=2, real=False, one_file=False, seed=0):
+
+    '''
+    Print a corpus of songs one after another through print_song, the way a
+    batch worker does, while tracemalloc follows the memory python has
+    allocated. The corpus is songs synthetic songs (small, medium and large
+    in turn) printed into a temporary folder, or every song in the
+    txt_input_files folder with real. Fails if the peak goes over budget_mb,
+    or if memory still held at the end has grown by more than growth_mb
+    since the first few songs (i.e. something is kept for every song
+    printed). Returns True if both checks passed.
+    '''
+
+    from batch_chord_charts import song_folder, warm_worker, print_song
+
+    rng = random.Random(seed)
+    presets = sorted(synthetic_presets)
+
+    with tempfile.TemporaryDirectory() as input_dir, tempfile.TemporaryDirectory() as output_dir:
+
+        if real:
+            input_dir = song_folder
+            song_names = sorted(song for song in os.listdir(song_folder) if song.endswith('.txt'))
+        else:
+            song_names = []
+            for i in range(songs):
+                title = 'Synthetic Song %d' % (i + 1)
+                with open(os.path.join(input_dir, title + ' chords - G.txt'), 'w') as f:
+                    f.write(synthetic_song(rng, title, **synthetic_presets[presets[i % len(presets)]]))
+                song_names.append(title + ' chords - G.txt')
+
+        # load the fonts and logo and print one chart first, so one-off work isn't counted as growth
+        warm_worker()
+        print_song(song_names[0], keys[:1], one_file, input_dir, output_dir)
+
+        # memory held once the first few songs are done is the baseline (any caches that fill up as
+        # songs are printed, e.g. reportlab's, have filled up by then)
+        baseline_songs = min(len(song_names), 10)
+        checkpoints = sorted({baseline_songs, len(song_names)} | {len(song_names) * i // 4 for i in range(1, 4)})
+        rows = []
+        failures = []
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        for i, song in enumerate(song_names, 1):
+            _, printed, errors, _ = print_song(song, keys, one_file, input_dir, output_dir)
+            failures.extend(errors)
+            if i in checkpoints:
+                current, peak = tracemalloc.get_traced_memory()
+                rows.append((i, current / 2**20, peak / 2**20))
+        elapsed = time.perf_counter() - start
+        tracemalloc.stop()
+
+    baseline = next(current for i, current, _ in rows if i == baseline_songs)
+    growth = rows[-1][1] - baseline
+    peak = max(peak for _, _, peak in rows)
+
+    print('%d %s songs x %d keys printed in %.1f s (%d failed)' % (len(song_names), 'real' if real else 'synthetic',
+                                                                 len(keys), elapsed, len(failures)))
+    print('    %8s %12s %12s' % ('songs', 'held MB', 'peak MB'))
+    for i, current, peak_so_far in rows:
+        print('    %8d %12.2f %12.2f' % (i, current, peak_so_far))
+    print('    peak resident memory (whole process): %.1f MB' % peak_rss_mb())
+
+    checks = [('peak %.2f MB within %.1f MB budget' % (peak, budget_mb), peak <= budget_mb),
+              ('growth %.2f MB after the first %d songs within %.1f MB' % (growth, baseline_songs, growth_mb), growth <= growth_mb),
+              ('no charts failed', not failures)]
+    for check, passed in checks:
+        print('    %-60s %s' % (check, 'ok' if passed else 'FAILED'))
+
+    passed = all(passed for _, passed in checks)
+    print('PASSED' if passed else 'FAILED')
+    return passed
+
+
+################################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmarks for the chord chart scripts')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    parser_replace = subparsers.add_parser('replace_chords', help='time the chord line rewriter')
+    parser_replace.add_argument('songs', nargs='*', default=default_songs, help='song .txt files to use as the corpus')
+    parser_replace.add_argument('--line-length', type=int, default=10000, help='length of the synthetic chord lines')
+    parser_replace.add_argument('--lines', type=int, default=20, help='number of synthetic chord lines')
+    parser_replace.add_argument('--repeat', type=int, default=5, help='number of timing runs (best is reported)')
+
+    parser_classify = subparsers.add_parser('classify', help='compare the line classifier with KMeans')
+    parser_classify.add_argument('songs', nargs='*', default=default_songs, help='song .txt files to use as the corpus')
+    parser_classify.add_argument('--repeat', type=int, default=5, help='number of timing runs (best is reported)')
+
+    parser_startup = subparsers.add_parser('startup', help='time printing one chart from a cold interpreter')
+    parser_startup.add_argument('--song', default='Mighty Cross chords - G.txt', help='song in the txt_input_files folder')
+    parser_startup.add_argument('--key', default='A', help='key to print the song in')
+    parser_startup.add_argument('--runs', type=int, default=5, help='number of cold runs (median is reported)')
+
+    parser_file_io = subparsers.add_parser('file_io', help='count file operations for a batch of charts')
+    parser_file_io.add_argument('songs', nargs='*', help='songs in the txt_input_files folder (default: all of them)')
+    parser_file_io.add_argument('--one-file', action='store_true', help='print each song as one PDF with a page for each key')
+
+    parser_server = subparsers.add_parser('server', help='time requests to chord_chart_server')
+    parser_server.add_argument('songs', nargs='*', help='songs in the txt_input_files folder (default: all of them)')
+    parser_server.add_argument('--requests', type=int, default=200, help='number of warm requests')
+    parser_server.add_argument('--jobs', type=int, default=1, help='number of server worker processes')
+    parser_server.add_argument('--port', type=int, default=8765, help='port to run the server on')
+
+    parser_stress = subparsers.add_parser('stress', help='print one song into one folder from many threads and processes at once')
+    parser_stress.add_argument('--song', default='Mighty Cross chords - G.txt', help='song in the txt_input_files folder')
+    parser_stress.add_argument('--threads', type=int, default=8, help='number of threads')
+    parser_stress.add_argument('--processes', type=int, default=4, help='number of processes')
+    parser_stress.add_argument('--rounds', type=int, default=4, help='number of times each worker prints the song in every key')
+
+    parser_stages = subparsers.add_parser('stages', help='time each stage of printing a chart on real and synthetic songs')
+    parser_stages.add_argument('songs', nargs='*', default=default_songs, help='song .txt files to time')
+    parser_stages.add_argument('--synthetic', nargs='*', default=['small', 'medium', 'large'], choices=sorted(synthetic_presets),
+                               help='sizes of synthetic songs to time')
+    parser_stages.add_argument('--lines', type=int, help='also time a custom synthetic song with this many lines of lyrics')
+    parser_stages.add_argument('--sections', type=int, default=6, help='number of sections in the custom synthetic song')
+    parser_stages.add_argument('--chord-density', type=float, default=3, help='chords per line in the custom synthetic song')
+    parser_stages.add_argument('--accidentals', type=float, default=0.25, help='share of chords with a sharp or flat in the custom synthetic song')
+    parser_stages.add_argument('--slash-chords', type=float, default=0.2, help='share of slash chords in the custom synthetic song')
+    parser_stages.add_argument('--repeat', type=int, default=3, help='number of times to print each song in every key')
+    parser_stages.add_argument('--json', help='file to write the results to')
+    parser_stages.add_argument('--compare', help='results file from an earlier run to compare with')
+
+    parser_layout = subparsers.add_parser('layout', help='time laying out a song in every key with and without the shared layout')
+    parser_layout.add_argument('songs', nargs='*', default=default_songs, help='song .txt files to lay out')
+    parser_layout.add_argument('--repeat', type=int, default=5, help='number of timing runs (best is reported)')
+
+    parser_font_sizes = subparsers.add_parser('font_sizes', help='time and check fitting the font size of every line of a long song')
+    parser_font_sizes.add_argument('--lines', type=int, default=500, help='lines of lyrics in the synthetic song')
+    parser_font_sizes.add_argument('--repeat', type=int, default=5, help='number of timing runs (best is reported)')
+
+    parser_string_width = subparsers.add_parser('string_width', help='time measuring lines with string_width against reportlab')
+    parser_string_width.add_argument('songs', nargs='*', default=default_songs, help='song .txt files to measure the lines of')
+    parser_string_width.add_argument('--repeat', type=int, default=5, help='number of timing runs (best is reported)')
+
+    parser_pages = subparsers.add_parser('pages', help='time and check packing short and long songs into columns and pages')
+    parser_pages.add_argument('songs', nargs='*', default=default_songs, help='song .txt files to pack')
+    parser_pages.add_argument('--repeat', type=int, default=5, help='number of timing runs (best is reported)')
+
+    parser_draw = subparsers.add_parser('draw_sections', help='compare the page content and time of drawing sections as text objects and line by line')
+    parser_draw.add_argument('songs', nargs='*', default=default_songs, help='song .txt files to draw')
+    parser_draw.add_argument('--repeat', type=int, default=5, help='number of timing runs (best is reported)')
+
+    parser_transpose = subparsers.add_parser('transpose_text', help='time transposing song text without printing a chart')
+    parser_transpose.add_argument('songs', nargs='*', default=default_songs, help='song .txt files to use as the corpus')
+    parser_transpose.add_argument('--synthetic-lines', type=int, default=100000, help='lines of lyrics in the synthetic song streamed through transpose_lines')
+    parser_transpose.add_argument('--repeat', type=int, default=5, help='number of timing runs (best is reported)')
+
+    parser_timing = subparsers.add_parser('timing_report', help='summarise a file of timing records')
+    parser_timing.add_argument('timing_file', help='file written with CHORD_CHART_TIMING or batch_chord_charts --timing')
+
+    parser_memory = subparsers.add_parser('memory', help='check memory stays within a budget while printing a large corpus')
+    parser_memory.add_argument('--songs', type=int, default=1000, help='number of synthetic songs to print')
+    parser_memory.add_argument('--keys', nargs='+', default=['A'], help='keys to print each song in')
+    parser_memory.add_argument('--budget-mb', type=float, default=16, help='most memory python may have allocated at once')
+    parser_memory.add_argument('--growth-mb', type=float, default=2, help='most memory that may still be held after the corpus than after the first songs')
+    parser_memory.add_argument('--real', action='store_true', help='print every song in the txt_input_files folder instead of synthetic songs')
+    parser_memory.add_argument('--one-file', action='store_true', help='print each song as one PDF with a page for each key')
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'replace_chords':
+        benchmark_replace_chords(args.songs, line_length=args.line_length, n_lines=args.lines, repeat=args.repeat)
+    elif args.benchmark == 'classify':
+        benchmark_classify(args.songs, repeat=args.repeat)
+    elif args.benchmark == 'startup':
+        benchmark_startup(args.song, args.key, runs=args.runs)
+    elif args.benchmark == 'file_io':
+        from build_chord_chart_function import input_dir
+        songs = args.songs or sorted(s for s in os.listdir(input_dir) if s.endswith('.txt'))
+        benchmark_file_io(songs, one_file=args.one_file)
+    elif args.benchmark == 'server':
+        from build_chord_chart_function import input_dir
+        songs = args.songs or sorted(s for s in os.listdir(input_dir) if s.endswith('.txt'))
+        benchmark_server(songs, port=args.port, requests=args.requests, jobs=args.jobs)
+    elif args.benchmark == 'stress':
+        sys.exit(0 if benchmark_stress(args.song, threads=args.threads, processes=args.processes, rounds=args.rounds) else 1)
+    elif args.benchmark == 'stages':
+        custom = None
+        if args.lines:
+            custom = dict(lines=args.lines, sections=args.sections, chord_density=args.chord_density,
+                          accidentals=args.accidentals, slash_chords=args.slash_chords)
+        benchmark_stages(args.songs, synthetic=args.synthetic, custom=custom, repeat=args.repeat,
+                         json_path=args.json, compare_path=args.compare)
+    elif args.benchmark == 'layout':
+        benchmark_layout(args.songs, repeat=args.repeat)
+    elif args.benchmark == 'font_sizes':
+        benchmark_font_sizes(args.lines, repeat=args.repeat)
+    elif args.benchmark == 'string_width':
+        benchmark_string_width(args.songs, repeat=args.repeat)
+    elif args.benchmark == 'pages':
+        sys.exit(0 if benchmark_pages(args.songs, repeat=args.repeat) else 1)
+    elif args.benchmark == 'draw_sections':
+        benchmark_draw_sections(args.songs, repeat=args.repeat)
+    elif args.benchmark == 'transpose_text':
+        benchmark_transpose_text(args.songs, synthetic_lines=args.synthetic_lines, repeat=args.repeat)
+    elif args.benchmark == 'timing_report':
+        timing_report(args.timing_file)
+    elif args.benchmark == 'memory':
+        sys.exit(0 if benchmark_memory(args.songs, args.keys, args.budget_mb, args.growth_mb, args.real, args.one_file) else 1)
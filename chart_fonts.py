@@ -0,0 +1,107 @@
+# Fonts used to print the chord charts
+
+# This file registers the Inconsolata Semi-Condensed fonts with reportlab.
+# Registering a TrueType font parses the whole font file, so each font is only
+# registered once per process and every chart after that reuses the metrics.
+
+# It also works out the width of text in each font (string_width) from a table
+# of every character's advance width, made when the font is registered, so
+# laying out a chart never has to go through reportlab. Inconsolata is
+# monospaced, so a line made only of characters with the usual advance width
+# (450/1000 of the font size) is measured by counting its characters; any
+# other line is added up character by character and remembered.
+
+
+
+# Importing Libraries
+import os
+import threading
+
+
+# font names used when printing and the font file for each one
+font_files = {
+    'Inconsolata':     'Inconsolata_SemiCondensed-Regular.ttf',
+    'InconsolataBold': 'Inconsolata_SemiCondensed-Bold.ttf',
+}
+
+# path each font has been registered from in this process
+registered_fonts = {}
+font_lock = threading.Lock()
+
+# the widths of each registered font's characters, and the most mixed strings (ones with characters that
+# aren't the usual width) to remember the widths of for each font
+font_widths = {}
+max_cached_widths = 4096
+
+
+
+class FontWidths:
+    ''' Advance widths (in 1/1000 of the font size) of every character in a font, for measuring text. '''
+
+    def __init__(self, char_widths, default_width):
+        self.char_widths = char_widths
+        self.default_width = default_width
+
+        # the width most characters have (every character but accents and the like, in a monospaced font)
+        widths = [width for width in char_widths.values() if width]
+        self.advance = max(set(widths), key=widths.count) if widths else default_width
+        self.regular_chars = frozenset(chr(code) for code, width in char_widths.items() if width == self.advance)
+        self.regular_ascii = all(char_widths.get(code, default_width) == self.advance for code in range(128))
+        self.cache = {}
+
+    def width(self, text):
+        ''' Width of text in 1/1000 of the font size. '''
+
+        # (python knows whether a string is all ascii without looking through it)
+        if (self.regular_ascii and text.isascii()) or self.regular_chars.issuperset(text):
+            return len(text) * self.advance
+
+        width = self.cache.get(text)
+        if width is None:
+            width = sum(self.char_widths.get(ord(char), self.default_width) for char in text)
+            if len(self.cache) >= max_cached_widths:
+                self.cache.pop(next(iter(self.cache)), None)
+            self.cache[text] = width
+        return width
+
+
+
+def get_font_widths(font_name):
+    ''' The character widths of a registered font. '''
+    try:
+        return font_widths[font_name]
+    except KeyError:
+        raise KeyError('The font ' + font_name + ' has not been registered (call register_fonts first)') from None
+
+
+def string_width(text, font_name, font_size):
+    ''' Width of text in a registered font at font_size (the same as reportlab's stringWidth, without going through reportlab). '''
+    return 0.001 * font_size * get_font_widths(font_name).width(text)
+
+
+def ascii_advance(font_name):
+    ''' Width (in 1/1000 of the font size) of every ascii character in a registered font, or None if they aren't all the same width. '''
+    widths = get_font_widths(font_name)
+    return widths.advance if widths.regular_ascii else None
+
+
+def register_fonts(font_dir):
+    '''
+    Register the chart fonts from font_dir with reportlab, unless they've
+    already been registered from there. Batch workers can call this when
+    they start so that the first chart doesn't pay for loading the fonts.
+    '''
+    font_paths = {name: os.path.join(font_dir, file_name) for name, file_name in font_files.items()}
+    if all(registered_fonts.get(name) == path for name, path in font_paths.items()):
+        return
+
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    with font_lock:
+        for name, path in font_paths.items():
+            if registered_fonts.get(name) != path:
+                font = TTFont(name, path)
+                pdfmetrics.registerFont(font)
+                font_widths[name] = FontWidths(dict(font.face.charWidths), font.face.defaultWidth)
+                registered_fonts[name] = path
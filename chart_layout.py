@@ -0,0 +1,423 @@
+# Laying out a chord chart
+
+# This file works out where everything on a chord chart goes: the paragraphs
+# (sections) of a song, the font size of each line, and the page, position,
+# size and shading of the rectangle around each section and of each line in
+# it. Sections are packed into two columns a page, in song order, adding
+# pages when a song is too long for one.
+
+# Almost none of this depends on the key a song is put into - the headings
+# and lyrics are the same in every key, and so are the number of lines in
+# each section and so how they're packed into pages - so it's worked out once per parsed song and kept with the
+# song (songs come out of the parse cache, so every key of a song shares it).
+# The only thing that can change from key to key is the length of a line of
+# chords (e.g. G becoming Bb), so for each key only the chord lines whose
+# length changed get their font size worked out again.
+
+# Lines are measured with the widths of the fonts' characters (see
+# chart_fonts.string_width), so the fonts need to be registered first.
+
+
+
+
+# Importing Libraries
+from chart_fonts import string_width, ascii_advance
+
+
+# page margins
+center = 8.5*72/2
+center_left_margin = center - 10
+center_right_margin = center + 10
+left_margin = 0.5*72
+right_margin = (8.5-0.5)*72
+top_margin = 0.5*72
+bottom_margin = (11-0.5)*72
+width = 8.5*72
+height = 11*72
+
+# font size for each line (unless the line is too long to fit)
+default_font_size = 10
+
+# distance from one line to the next in a rectangle (10pt for the font plus 1pt between lines)
+line_spacing = 11
+
+# width a line has to fit in (a column, less 8pt of padding on each side of the rectangle)
+text_width = center_left_margin - left_margin - 2*8
+
+
+
+#####################################################################################
+
+# define function to print "paragraphs"/sections of a song onto the PDF
+
+def print_paragraphs(song):
+
+    """
+    This function takes a song and outputs a list of lists containing indices of each line in each paragraph.
+
+    """
+
+    # define starter variables
+    current_paragraph_list = []
+    paragraphs_list = []
+    first_heading = False # only start printing to the paragraph list once we've found the first heading in the song
+
+    i = 0
+    while i < len(song.lines):
+
+        # create a new list of indices every time you get to a new heading (after the first heading in the song)
+        if song.lines[i].line_class == 'heading':
+
+            # if we have a previously completed paragraph
+            if len(current_paragraph_list) != 0:
+                paragraphs_list.append(current_paragraph_list)
+
+            # append location of text to current paragraph list
+            current_paragraph_list = [i]
+            first_heading = True
+
+        elif first_heading == True:
+            current_paragraph_list.append(i)
+
+        # go to next line
+        i+=1
+
+    # append the final paragraph list to the overall list
+    paragraphs_list.append(current_paragraph_list)
+
+
+    return(paragraphs_list)
+
+
+###############################################################################
+
+# define functions to work out the font size for each line of a song
+
+def line_font(line_class):
+    ''' Font a line is printed in (lyrics in the regular font, everything else in bold). '''
+    return 'Inconsolata' if line_class == 'lyrics' else 'InconsolataBold'
+
+
+def line_width(text, line_class):
+    ''' Width of a line at a font size of 1 (spaces at the end, like the one added when a song is parsed, don't take up room on the page). '''
+    return string_width(text.rstrip(), line_font(line_class), 1)
+
+
+def fit_font_size(width):
+    ''' Font size that fits a line (width wide at a font size of 1) exactly in a column (default 10 unless the line is too long). '''
+    return default_font_size if width * default_font_size <= text_width else text_width / width
+
+
+def ascii_fit(font_name):
+    '''
+    For a font whose ascii characters are all the same width: that width (in
+    1/1000 of the font size) and the most of them that fit in a column at
+    the default size (worked out the same way as fit_font_size, so the two
+    always agree). (None, None) for any other font.
+    '''
+    advance = ascii_advance(font_name)
+    if advance is None:
+        return None, None
+
+    max_chars = int(text_width / (0.001 * advance * default_font_size))
+    while 0.001 * ((max_chars + 1) * advance) * default_font_size <= text_width:
+        max_chars += 1
+    while max_chars > 0 and 0.001 * (max_chars * advance) * default_font_size > text_width:
+        max_chars -= 1
+    return advance, max_chars
+
+
+def line_font_sizes(song):
+
+    # determine the font size each line needs to fit (default 10 unless the line will be too long)
+    # (almost every line is all ascii, and every ascii character is the same width, so a line like that is left
+    # at the default size if it fits even counting the spaces at the end, and otherwise measured by counting
+    # its characters without them - only lines with other characters are measured with line_width)
+    lyrics_advance, lyrics_max = ascii_fit('Inconsolata')
+    bold_advance, bold_max = ascii_fit('InconsolataBold')
+    lines = song.lines
+    fitted = [default_font_size] * len(lines)
+    shrunk = []
+    for i, line in enumerate(lines):
+        text = line.text
+        if line.line_class == 'lyrics':
+            advance, max_chars = lyrics_advance, lyrics_max
+        else:
+            advance, max_chars = bold_advance, bold_max
+        if advance is not None and text.isascii():
+            if len(text) <= max_chars:
+                continue
+            chars = len(text.rstrip())
+            if chars <= max_chars:
+                continue
+            fitted[i] = text_width / (0.001 * (chars * advance))
+        else:
+            fitted[i] = fit_font_size(line_width(text, line.line_class))
+            if fitted[i] == default_font_size:
+                continue
+        shrunk.append(i)
+
+    # if a lyrics line is shortened, have to also shorten the line (usually chords) above it, and if a chords line
+    # is shortened, the lyrics underneath are shortened with it so the chords stay over the right words
+    # (only the lines that were shortened need looking at)
+    line_font_size = list(fitted)
+    last = len(lines) - 1
+    for i in shrunk:
+        line_class = lines[i].line_class
+        if line_class == 'lyrics':
+            if i > 0 and fitted[i] < line_font_size[i-1]:
+                line_font_size[i-1] = fitted[i]
+        elif line_class == 'chords' and i < last and lines[i+1].line_class == 'lyrics' and fitted[i] < line_font_size[i+1]:
+            line_font_size[i+1] = fitted[i]
+
+
+    return(line_font_size)
+
+
+###############################################################################
+
+# the layout of a song that's the same in every key
+
+class ChartBox:
+    ''' The rectangle around one paragraph of a song (or part of one, if it's too long for a column), the page it's on, and where each of its lines (by index into the song) goes. '''
+
+    __slots__ = ('page', 'x', 'y', 'width', 'height', 'shaded', 'lines')
+
+    def __init__(self, page, x, y, width, height, shaded, lines):
+        self.page = page
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.shaded = shaded
+        self.lines = lines
+
+
+class SongLayout:
+    '''
+    Everything about where a song goes on a chart that doesn't depend on the
+    key it's in (including the number of pages it takes), plus the chord
+    lines whose font size can change with the key: (line index, length as
+    written, size it needs as written, largest size the line below allows,
+    largest size the lyrics below can be or None) for every chord line.
+    '''
+
+    __slots__ = ('paragraphs', 'line_font_size', 'boxes', 'pages', 'chord_lines')
+
+    def __init__(self, paragraphs, line_font_size, boxes, pages, chord_lines):
+        self.paragraphs = paragraphs
+        self.line_font_size = line_font_size
+        self.boxes = boxes
+        self.pages = pages
+        self.chord_lines = chord_lines
+
+
+###############################################################################
+
+# define functions to pack the paragraphs of a song into columns and pages
+
+# left edge of the rectangles in each column of a page, and the top and bottom of the room for them
+# (every page has the title and key across the top, so every column is the same height)
+column_x = [left_margin, center_right_margin]
+column_top = top_margin + 25
+column_bottom = bottom_margin
+
+# space between one rectangle and the next in a column
+box_gap = 5
+
+
+def box_height(lines):
+    ''' Height of the rectangle around lines lines (10pt for each line plus 1pt between lines, and 5pt top and bottom margins). '''
+    return 5 + lines*10 + lines*1 + 5
+
+
+def column_height(pieces):
+    ''' Height a list of (paragraph, lines) pieces takes up stacked in one column. '''
+    return sum(box_height(len(lines)) for paragraph, lines in pieces) + box_gap*(len(pieces) - 1)
+
+
+def fill_columns(paragraphs):
+
+    '''
+    Put the paragraphs (lists of line indices) into columns in song order,
+    each one under the one before if there's room and otherwise at the top
+    of the next column. A paragraph too long for a whole column fills what's
+    left of the column it starts in (at least its heading and a line) and
+    carries on at the top of the next. Since every column is filled before
+    the next is started, this takes the fewest columns the song can fit in
+    without changing its order. Returns a list of columns, each a list of
+    (paragraph number, lines) pieces.
+    '''
+
+    columns = [[]]
+    current_y = column_top
+
+    for p, paragraph in enumerate(paragraphs):
+        lines = paragraph
+        while lines:
+
+            # the whole (rest of the) paragraph fits in this column
+            if box_height(len(lines)) <= column_bottom - current_y:
+                pieces = len(lines)
+
+            # it would fit at the top of the next column, or this column only has room for a line or two of it
+            elif box_height(len(lines)) <= column_bottom - column_top or \
+                 (columns[-1] and box_height(2) > column_bottom - current_y):
+                columns.append([])
+                current_y = column_top
+                continue
+
+            # it's too long for any column, so fill this one with as much of it as fits
+            else:
+                pieces = max(int((column_bottom - current_y - 10) // line_spacing), 1)
+
+            columns[-1].append((p, lines[:pieces]))
+            current_y += box_height(pieces) + box_gap
+            lines = lines[pieces:]
+
+
+    return(columns)
+
+
+def balance_last_page(columns):
+
+    '''
+    Split the pieces on the last page of a song that takes more than one
+    page between its two columns as evenly as possible (keeping them in
+    order), so the last page isn't a full column next to a nearly empty one.
+    A song that fits on one page is left filling the left column first.
+    '''
+
+    if len(columns) <= 2:
+        return(columns)
+
+    first = len(columns) - 2 + len(columns) % 2
+    pieces = [piece for column in columns[first:] for piece in column]
+
+    # the split with the shortest taller column (the left column keeps the extra when it can't be even)
+    best = None
+    for split in range(len(pieces), 0, -1):
+        left, right = pieces[:split], pieces[split:]
+        taller = max(column_height(left), column_height(right) if right else 0)
+        if taller <= column_bottom - column_top and (best is None or taller < best[0]):
+            best = (taller, left, right)
+
+    if best is None:
+        return(columns)
+
+
+    return(columns[:first] + [best[1], best[2]])
+
+
+def pack_paragraphs(song, paragraphs):
+
+    '''
+    Pack a song's paragraphs into columns (two to a page) and pages, in song
+    order, using as few pages as possible and balancing the columns of the
+    last page. Returns the boxes and the number of pages.
+    '''
+
+    columns = balance_last_page(fill_columns([paragraph for paragraph in paragraphs if paragraph]))
+
+    boxes = []
+    for c, column in enumerate(columns):
+        current_x = column_x[c % 2]
+        current_y = column_top
+
+        for p, lines in column:
+
+            # the rectangle is shaded grey for a chorus (the heading is the first line of the paragraph) and white for everything else
+            heading = song.lines[paragraphs[p][0]].text.lower()
+            shaded = ('chorus' in heading) and ('pre' not in heading)
+
+            # text starts 8pt in from the left and 15pt down from the top (10pt for the font, since
+            # text is positioned from the bottom, plus 5pt for the top margin), one line every 11pt
+            rect_width = center_left_margin - left_margin
+            rect_height = box_height(len(lines))
+            positions = [(i, current_x + 8, current_y + 15 + line_spacing*n) for n, i in enumerate(lines)]
+            boxes.append(ChartBox(c // 2, current_x, current_y, rect_width, rect_height, shaded, positions))
+
+            current_y += rect_height + box_gap
+
+
+    return(boxes, (len(columns) + 1) // 2)
+
+
+###############################################################################
+
+# define functions to lay out a song
+
+def layout_song(song):
+
+    '''
+    Work out the key-independent layout of a parsed song: its paragraphs,
+    the font size of each line (from the song as it was written) and a box
+    for each paragraph, packed into columns and pages (see pack_paragraphs).
+    '''
+
+    paragraphs = print_paragraphs(song)
+    line_font_size = line_font_sizes(song)
+    boxes, pages = pack_paragraphs(song, paragraphs)
+
+    # for each chord line, the size it needs as written, the largest it can be because of the line under it
+    # (the lyrics it's over), and the largest those lyrics can be whatever the chords are (None if there are
+    # no lyrics under it)
+    chord_lines = []
+    for i, line in enumerate(song.lines):
+        if line.line_class == 'chords':
+            chords_size = fit_font_size(line_width(line.text, 'chords'))
+            below = song.lines[i+1] if i + 1 < len(song.lines) else None
+            if below is not None and below.line_class == 'lyrics':
+                after = song.lines[i+2] if i + 2 < len(song.lines) else None
+                below_size = fit_font_size(line_width(below.text, 'lyrics'))
+                lyrics_size = min(below_size, fit_font_size(line_width(after.text, 'lyrics')) if after is not None and after.line_class == 'lyrics'
+                                  else default_font_size)
+                chord_lines.append((i, len(line.text.rstrip()), chords_size, below_size, lyrics_size))
+            else:
+                chord_lines.append((i, len(line.text.rstrip()), chords_size, default_font_size, None))
+
+
+    return(SongLayout(paragraphs, line_font_size, boxes, pages, chord_lines))
+
+
+def song_layout(song):
+    ''' The key-independent layout of a parsed song (worked out the first time it's needed, then kept on the song). '''
+    if song.layout is None:
+        song.layout = layout_song(song)
+    return song.layout
+
+
+###############################################################################
+
+# define function to work out the font size for each line of a song that has been put into a key
+
+def key_font_sizes(song):
+
+    '''
+    Font size for each line of a song that has been put into a key: the
+    sizes from the song's layout, except for chord lines that came out a
+    different length in this key, which are fitted again (along with the
+    lyrics underneath them, which are sized with the chords).
+    '''
+
+    layout = song_layout(song.song)
+    line_font_size = layout.line_font_size
+
+    # (a new key only changes chord roots and spaces, so a line that's the same length without the spaces at
+    # the end is the same width, and the list is only copied if some line needs a different size)
+    copied = False
+    for i, length, written_size, below_size, lyrics_size in layout.chord_lines:
+        if len(song.text2[i].rstrip()) == length:
+            continue
+        chords_size = fit_font_size(line_width(song.text2[i], 'chords'))
+        if chords_size != written_size:
+            sizes = [(i, min(chords_size, below_size))] + ([(i + 1, min(chords_size, lyrics_size))] if lyrics_size is not None else [])
+            for j, font_size in sizes:
+                if font_size != line_font_size[j]:
+                    if not copied:
+                        line_font_size = list(line_font_size)
+                        copied = True
+                    line_font_size[j] = font_size
+
+
+    return(line_font_size)
@@ -0,0 +1,113 @@
+# Keeping track of which chord charts are up to date
+
+# This file keeps a manifest (a json file next to the pdf_chord_charts folder)
+# of every chart that has been printed: the hash of the song file it was
+# printed from, the key, the renderer version and where the PDF was saved.
+# A batch only needs to print the charts whose song file or renderer changed,
+# and the charts of songs that were deleted can be removed.
+
+# Example entry: {"Mighty Cross chords - G.txt": {"A": {"hash": "3f1c...",
+#                 "renderer_version": "1", "path": "pdf_chord_charts/Mighty Cross/Mighty Cross chords - A.pdf"}}}
+
+
+
+
+# Importing Libraries
+import os
+import json
+import hashlib
+
+from atomic_files import write_atomic
+
+
+# manifest version - bump if the layout of the manifest file changes (an old manifest is then ignored)
+manifest_version = 1
+
+
+
+def hash_song_file(song_path):
+    ''' Hash of a song file's contents (None if it can't be read, so its charts always count as out of date). '''
+    try:
+        with open(song_path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+
+def load_manifest(manifest_path):
+    ''' Read the manifest (an empty one if there isn't one yet or it can't be read). '''
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(manifest, dict) or manifest.get('manifest_version') != manifest_version:
+        return {}
+
+    return manifest.get('songs', {})
+
+
+
+def save_manifest(manifest, manifest_path):
+    ''' Write the manifest (through a temporary file and a rename, see atomic_files). '''
+    write_atomic(manifest_path, json.dumps({'manifest_version': manifest_version, 'songs': manifest}, indent=1, sort_keys=True).encode())
+
+
+
+def stale_keys(manifest, song, song_hash, keys, renderer_version, root):
+    '''
+    The keys a song needs to be printed in: keys it has never been printed
+    in, or that were printed from a different version of the song file or
+    by a different renderer version, or whose PDF has gone missing.
+    '''
+    charts = manifest.get(song, {})
+
+    return [key for key in keys
+            if song_hash is None
+            or key not in charts
+            or charts[key]['hash'] != song_hash
+            or charts[key]['renderer_version'] != renderer_version
+            or not os.path.exists(os.path.join(root, charts[key]['path']))]
+
+
+
+def record_chart(manifest, song, key, song_hash, renderer_version, path, root):
+    '''
+    Record a chart that has just been printed (path is where the PDF was
+    saved, stored relative to root). If the chart used to be saved somewhere
+    else (the song's title changed) the old PDF is removed.
+    '''
+    path = os.path.relpath(path, root)
+    charts = manifest.setdefault(song, {})
+
+    if key in charts and charts[key]['path'] != path:
+        remove_pdf(os.path.join(root, charts[key]['path']))
+
+    charts[key] = {'hash': song_hash, 'renderer_version': renderer_version, 'path': path}
+
+
+
+def remove_song(manifest, song, root):
+    ''' Remove every chart of a song from the disk and the manifest. Returns the number of charts removed. '''
+    charts = manifest.pop(song, {})
+
+    for chart in charts.values():
+        remove_pdf(os.path.join(root, chart['path']))
+
+    return len(charts)
+
+
+
+def remove_pdf(path):
+    ''' Remove a PDF (if it's still there) and its song's folder once the folder is empty. '''
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+    try:
+        os.rmdir(os.path.dirname(path))
+    except OSError:
+        pass
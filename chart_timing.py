@@ -0,0 +1,154 @@
+# Timing and profiling charts as they're printed
+
+# This file times each stage of printing a chart when it's turned on, by
+# setting environment variables (or calling enable_timing/enable_profiling):
+#
+#     CHORD_CHART_TIMING=timing.jsonl   adds a line of json for every song
+#                                       read in and every chart printed
+#     CHORD_CHART_PROFILE=profiles      saves cProfile stats for each song
+#                                       (profiles/<song>.prof, open with pstats
+#                                       or snakeviz)
+#
+# A song record has the time (ms) taken reading and parsing the song and its
+# line/chord counts. A chart record has the song, key, time taken by each
+# stage (transpose, canvas, layout, draw, logo, save, write), the song's
+# line/chord counts and the size of the PDF. When timing is off, each stage
+# costs one attribute lookup.
+
+# Example chart record: {"record": "chart", "song": "Mighty Cross chords - G.txt", "key": "A",
+#                        "stages": {"transpose": 0.1, ..., "write": 0.4}, "total_ms": 9.8,
+#                        "lines": 91, "chord_lines": 33, "chords": 120, "bytes": 56673, "path": "..."}
+
+
+
+
+# Importing Libraries
+import os
+import json
+import time
+import cProfile
+import threading
+import contextlib
+
+
+# where to write timing records and profiles (None when turned off)
+timing_path = os.environ.get('CHORD_CHART_TIMING') or None
+profile_dir = os.environ.get('CHORD_CHART_PROFILE') or None
+
+# the record being timed in each thread
+current = threading.local()
+
+
+
+def enable_timing(path):
+    ''' Turn timing on (also for worker processes started after this), writing records to path. '''
+    global timing_path
+    timing_path = os.path.abspath(path)
+    os.environ['CHORD_CHART_TIMING'] = timing_path
+
+
+
+def enable_profiling(folder):
+    ''' Turn profiling on (also for worker processes started after this), saving stats for each song in folder. '''
+    global profile_dir
+    profile_dir = os.path.abspath(folder)
+    os.environ['CHORD_CHART_PROFILE'] = profile_dir
+
+
+
+def write_record(record):
+    ''' Add a record to the timing file (one write of one line, so processes writing at once don't mix lines). '''
+    line = (json.dumps(record) + '\n').encode()
+    timing_file = os.open(timing_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(timing_file, line)
+    finally:
+        os.close(timing_file)
+
+
+
+def song_counts(song):
+    ''' Number of lines, chord lines and chords in a parsed song. '''
+    chord_lines = [line for line in song.lines if line.line_class == 'chords']
+    return {'lines': len(song.lines), 'chord_lines': len(chord_lines),
+            'chords': sum(type(piece) == tuple for line in chord_lines for piece in line.chord_pieces)}
+
+
+
+@contextlib.contextmanager
+def timed_record(**fields):
+
+    '''
+    Time the stages (see lap) run inside the with block in this thread and
+    write them out as one record with the given fields (plus anything added
+    with note). Does nothing when timing is off.
+    '''
+
+    if timing_path is None or getattr(current, 'record', None) is not None:
+        yield
+        return
+
+    start = time.perf_counter()
+    record = dict(fields, stages={})
+    current.record = record
+    current.lap_start = start
+
+    try:
+        yield
+    finally:
+        current.record = None
+
+    record['total_ms'] = (time.perf_counter() - start) * 1000
+    write_record(record)
+
+
+
+def lap(stage):
+    ''' Count the time since the last lap (or the start of the record) towards a stage of the record being timed. '''
+    record = getattr(current, 'record', None)
+    if record is not None:
+        now = time.perf_counter()
+        record['stages'][stage] = record['stages'].get(stage, 0) + (now - current.lap_start) * 1000
+        current.lap_start = now
+
+
+
+def note(**fields):
+    ''' Add fields to the record being timed (if any). '''
+    record = getattr(current, 'record', None)
+    if record is not None:
+        record.update(fields)
+
+
+
+def note_song(song):
+    ''' Add the number of lines, chord lines and chords in a parsed song to the record being timed (if any). '''
+    record = getattr(current, 'record', None)
+    if record is not None:
+        record.update(song_counts(song))
+
+
+
+@contextlib.contextmanager
+def profiled(name):
+
+    '''
+    Profile the with block and save the stats to <profile_dir>/<name>.prof.
+    Does nothing when profiling is off or something in this thread is already
+    being profiled (e.g. a batch profiles a whole song, which prints each key).
+    '''
+
+    if profile_dir is None or getattr(current, 'profiling', False):
+        yield
+        return
+
+    profile = cProfile.Profile()
+    current.profiling = True
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        current.profiling = False
+        os.makedirs(profile_dir, exist_ok=True)
+        profile.dump_stats(os.path.join(profile_dir, name + '.prof'))
@@ -0,0 +1,253 @@
+# A small web server for chord charts
+
+# This file serves chord charts over HTTP, so anyone on the network can pull
+# up a song in the key they need (e.g. on a phone) without running anything:
+#
+#     http://<computer>:8000/chart?song=Mighty Cross chords - G.txt&key=A
+#
+# returns the PDF of the song in that key (".txt" can be left off the song).
+# /songs lists the songs and /stats shows how the cache is doing.
+
+# Charts are drawn in a pool of worker processes (so a slow chart doesn't
+# hold up anyone else's request) and the most recently used ones are kept in
+# memory, keyed on the hash of the song file, the key and the renderer
+# version, so an edited song is never served out of date. If the same chart
+# is asked for again while it's still being drawn, the request waits for
+# that chart instead of drawing it twice.
+
+# Usage: python chord_chart_server.py [--host 0.0.0.0] [--port 8000] [--jobs 2] [--cache-mb 64]
+
+
+
+
+# Importing Libraries
+import os
+import json
+import signal
+import asyncio
+import hashlib
+import argparse
+import collections
+import urllib.parse
+import concurrent.futures
+
+from build_chord_chart_function import renderer_version, render_chord_chart
+from batch_chord_charts import song_folder, start_worker
+from song_model import get_current_key, parse_song_bytes, render_song
+from music_theory import spelled_keys
+
+
+
+###############################################################################
+
+# work done in each worker process
+
+def render_chart(song_bytes, current_key, desired_key):
+    ''' Draw a song file's contents in the desired key and return the PDF (the song is parsed through the parse cache). '''
+    return(render_chord_chart(render_song(parse_song_bytes(song_bytes, current_key), desired_key)))
+
+
+
+###############################################################################
+
+# the charts that have been drawn most recently
+
+class ChartCache:
+    ''' The most recently used chart PDFs, keeping at most max_bytes of them in total. '''
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.charts = collections.OrderedDict()
+
+    def get(self, cache_key):
+        ''' Get a chart (None if it isn't cached) and mark it as the most recently used. '''
+        pdf = self.charts.get(cache_key)
+        if pdf is not None:
+            self.charts.move_to_end(cache_key)
+        return pdf
+
+    def put(self, cache_key, pdf):
+        ''' Add a chart, dropping the least recently used charts until everything fits. '''
+        if len(pdf) > self.max_bytes:
+            return
+        if cache_key in self.charts:
+            self.total_bytes -= len(self.charts.pop(cache_key))
+
+        self.charts[cache_key] = pdf
+        self.total_bytes += len(pdf)
+
+        while self.total_bytes > self.max_bytes:
+            self.total_bytes -= len(self.charts.popitem(last=False)[1])
+
+
+
+###############################################################################
+
+# the server
+
+class ChartServer:
+    ''' Answers HTTP requests for charts, drawing them in executor and caching up to max_cache_bytes of them. '''
+
+    def __init__(self, executor, max_cache_bytes):
+        self.executor = executor
+        self.cache = ChartCache(max_cache_bytes)
+        self.in_flight = {}
+        self.stats = collections.Counter()
+
+
+    async def get_chart(self, song, desired_key):
+
+        '''
+        Get the PDF for a song in a key, and how it was served: 'hit' (from
+        the cache), 'joined' (waited for the same chart that another request
+        was already drawing) or 'miss' (drawn for this request).
+        '''
+
+        with open(os.path.join(song_folder, song), 'rb') as f:
+            song_bytes = f.read()
+
+        cache_key = (hashlib.sha256(song_bytes).hexdigest(), desired_key, renderer_version)
+
+        pdf = self.cache.get(cache_key)
+        if pdf is not None:
+            return pdf, 'hit'
+
+        # the chart is shielded so that a request that gives up (e.g. the phone disconnects) doesn't stop
+        # the chart from being drawn for everyone else waiting on it, and from being cached
+        if cache_key in self.in_flight:
+            return await asyncio.shield(self.in_flight[cache_key]), 'joined'
+
+        chart = asyncio.get_running_loop().run_in_executor(self.executor, render_chart, song_bytes,
+                                                           get_current_key(song), desired_key)
+        self.in_flight[cache_key] = chart
+
+        def finished(chart):
+            del self.in_flight[cache_key]
+            if not chart.cancelled() and chart.exception() is None:
+                self.cache.put(cache_key, chart.result())
+
+        chart.add_done_callback(finished)
+
+        return await asyncio.shield(chart), 'miss'
+
+
+    async def respond(self, method, target):
+
+        ''' Work out the response to a request: (status, content type, body, extra headers). '''
+
+        if method != 'GET':
+            return '405 Method Not Allowed', 'text/plain', b'Only GET requests are supported\n', []
+
+        url = urllib.parse.urlsplit(target)
+        query = urllib.parse.parse_qs(url.query)
+
+        # list of songs
+        if url.path == '/songs':
+            songs = sorted(s for s in os.listdir(song_folder) if s.endswith('.txt'))
+            return '200 OK', 'application/json', json.dumps(songs, indent=1).encode(), []
+
+        # how the cache is doing
+        if url.path == '/stats':
+            stats = dict(self.stats, cached_charts=len(self.cache.charts), cached_bytes=self.cache.total_bytes,
+                         in_flight=len(self.in_flight))
+            return '200 OK', 'application/json', json.dumps(stats, indent=1).encode(), []
+
+        if url.path != '/chart':
+            return '404 Not Found', 'text/plain', b'Try /chart?song=<song>&key=<key>, /songs or /stats\n', []
+
+        # a song in a key
+        song = query.get('song', [''])[0]
+        desired_key = query.get('key', [''])[0]
+        if not song.endswith('.txt'):
+            song += '.txt'
+
+        # only serve files straight out of the song folder
+        if os.path.basename(song) != song or song.startswith('.') or not os.path.isfile(os.path.join(song_folder, song)):
+            return '404 Not Found', 'text/plain', ('No song called ' + song + '\n').encode(), []
+
+        if desired_key not in spelled_keys:
+            return '400 Bad Request', 'text/plain', ('Unknown key "' + desired_key + '"\n').encode(), []
+
+        try:
+            pdf, served = await self.get_chart(song, desired_key)
+        except Exception as error:
+            self.stats['errors'] += 1
+            return '500 Internal Server Error', 'text/plain', (type(error).__name__ + ': ' + str(error) + '\n').encode(), []
+
+        self.stats[served] += 1
+        file_name = urllib.parse.quote(song[:-len('.txt')].rsplit(' - ', 1)[0] + ' - ' + desired_key + '.pdf')
+        return '200 OK', 'application/pdf', pdf, [('Content-Disposition', "inline; filename*=UTF-8''" + file_name),
+                                                  ('X-Chart-Cache', served)]
+
+
+    async def handle(self, reader, writer):
+
+        ''' Answer one HTTP request (one request per connection). '''
+
+        try:
+            # read the request line and skip the headers
+            request_line = await asyncio.wait_for(reader.readline(), 10)
+            while (await asyncio.wait_for(reader.readline(), 10)) not in (b'\r\n', b'\n', b''):
+                pass
+
+            try:
+                method, target, version = request_line.decode('latin-1').split()
+            except ValueError:
+                return
+
+            status, content_type, body, headers = await self.respond(method, target)
+
+            head = ['HTTP/1.1 ' + status, 'Content-Type: ' + content_type, 'Content-Length: ' + str(len(body)),
+                    'Connection: close'] + [name + ': ' + value for name, value in headers]
+            writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+            await writer.drain()
+
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+
+        finally:
+            writer.close()
+
+
+
+async def serve(host, port, jobs, max_cache_bytes):
+
+    ''' Run the server until it's stopped (with Ctrl+C or a terminate signal). '''
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=start_worker) as executor:
+
+        # start every worker now (workers load the fonts and logo when they start) so the first charts are quick
+        for started in [executor.submit(os.getpid) for _ in range(jobs)]:
+            started.result()
+
+        chart_server = ChartServer(executor, max_cache_bytes)
+        http_server = await asyncio.start_server(chart_server.handle, host, port)
+
+        print('Serving chord charts on http://%s:%d/chart?song=<song>&key=<key> (Ctrl+C to stop)' % (host, port))
+
+        # a terminate signal stops the server the same way Ctrl+C does, so the workers are shut down with it
+        stopped = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+
+        async with http_server:
+            await stopped.wait()
+
+
+
+###############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Serve chord charts over HTTP')
+    parser.add_argument('--host', default='0.0.0.0', help='address to listen on (default: every address)')
+    parser.add_argument('--port', type=int, default=8000, help='port to listen on')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='number of worker processes drawing charts (default: one per cpu)')
+    parser.add_argument('--cache-mb', type=float, default=64, help='megabytes of charts to keep in memory')
+
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.jobs, int(args.cache_mb * 1024 * 1024)))
+    except KeyboardInterrupt:
+        print('Stopped')
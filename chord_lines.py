@@ -0,0 +1,215 @@
+# Processing for individual lines of a chord chart
+
+# This file finds the chords in a line of chords and rewrites them into another
+# key while keeping the chords lined up with the lyrics underneath them. It
+# can also transpose the text of a whole song (transpose_text, or line by line
+# with transpose_lines) without parsing it into a song or printing a PDF, for
+# when only the text is needed (e.g. for projector software or a message).
+
+
+
+# Importing Libraries
+import re
+
+from music_theory import encode_root, spell_root, transposition_table
+
+
+# a chord line is made of chord roots (a letter A-G with an optional sharp or flat), runs of spaces,
+# and everything else (chord qualities like 'm' or 'maj7', '/' for a different bass note, '(', 'x2', etc.)
+# the start of each match is the column offset of the token in the line
+chord_line_tokens = re.compile(r'([A-G][#b]?)|( +)|[^A-G ]+')
+
+# just the chord roots, and just the runs of spaces (for replace_chords, which copies everything else as it is)
+chord_roots = re.compile(r'[A-G][#b]?')
+space_runs = re.compile(r' +')
+
+
+# anything between spaces in a line of chords: a chord with an optional quality, extensions and bass note (in
+# parentheses or not, e.g. 'G', 'F#m7', 'Dsus4', '(G/B', 'D/F#)'), or a marking like 'x2', '|' or 'N.C.'
+chord_token = re.compile(r'''
+    \(? [A-G][#b]? (?:maj|min|m|dim|aug|sus|add|M|\+|°|ø)? (?:[0-9]+|[#b][0-9]+|sus[24]?|add[0-9]+|maj[0-9]+)* (?:/[A-G][#b]?)? \)?
+    | \(? x[0-9]+ \)?
+    | [|%/-]+
+    | N\.?C\.?
+''', re.VERBOSE)
+
+
+def classify_line(string):
+    '''
+    Classify a line of a song that isn't the title or a heading as 'chords'
+    or 'lyrics'. A line where every token reads as a chord is a line of
+    chords; anything else falls back on the text to space ratio (lines of
+    chords have more spaces than text characters).
+    '''
+    tokens = string.split()
+
+    if tokens and all(chord_token.fullmatch(token) for token in tokens):
+        return 'chords'
+
+    # number of characters that aren't spacing and number of spaces in text
+    nchar = sum(len(token) for token in tokens)
+    nspace = string.count(' ')
+
+    return 'chords' if nchar < nspace else 'lyrics'
+
+
+def join_chord_line(pieces):
+    '''
+    Join the pieces of a line of chords back into a string. Pieces are either
+    text (a run of spaces or anything else) or (original root length, new
+    root) pairs. When a new root is longer or shorter than the original, the
+    next run of spaces is shortened or lengthened so that the chords stay
+    above the same lyrics.
+    '''
+    # build the new line up as a list of pieces and join it once at the end
+    final_string = []
+
+    # net number of spaces to add after the chords replaced so far (one for each chord that got shorter,
+    # minus one for each chord that got longer - a negative number means spaces need to be removed)
+    spaces_to_add = 0
+
+    for piece in pieces:
+
+        if type(piece) == tuple:
+            chord_length, chord_replacement = piece
+
+            # if chord and replacement aren't the same length, record the space to adjust
+            if chord_length > len(chord_replacement):
+                spaces_to_add += 1
+            elif chord_length < len(chord_replacement):
+                spaces_to_add -= 1
+
+            final_string.append(chord_replacement)
+
+        elif piece[0] == ' ':
+
+            # resolve the spaces in the first run of spaces we reach, but only take spaces away
+            # if at least one space is left to separate the chords (otherwise try again at the next run)
+            if spaces_to_add > 0 or len(piece) > -spaces_to_add:
+                final_string.append(' ' * (len(piece) + spaces_to_add))
+                spaces_to_add = 0
+            else:
+                final_string.append(piece)
+
+        # anything that's not a chord or a space we'll just keep the way it is
+        else:
+            final_string.append(piece)
+
+    return ''.join(final_string)
+
+
+def replace_chords(string, chords_dict):
+    '''
+    Replace every chord root in a line of chords using chords_dict (roots
+    that aren't in chords_dict become 'NA'), keeping the chords lined up.
+    Only the roots are matched - the text between them is copied across in
+    slices, and only searched for a run of spaces to lengthen or shorten
+    when a replaced root has come out a different length.
+    '''
+    final_string = []
+    append = final_string.append
+
+    # net number of spaces to add after the chords replaced so far (see join_chord_line)
+    spaces_to_add = 0
+    position = 0
+
+    for root in chord_roots.finditer(string):
+        start = root.start()
+        if spaces_to_add:
+            position, spaces_to_add = resolve_spaces(string, position, start, spaces_to_add, append)
+        append(string[position:start])
+
+        # replace the chord with the chord replacement dict (it covers chords out of the current key as well)
+        chord = root.group()
+        chord_replacement = chords_dict.get(chord, 'NA')
+        if len(chord) > len(chord_replacement):
+            spaces_to_add += 1
+        elif len(chord) < len(chord_replacement):
+            spaces_to_add -= 1
+
+        append(chord_replacement)
+        position = root.end()
+
+    if spaces_to_add:
+        position, spaces_to_add = resolve_spaces(string, position, len(string), spaces_to_add, append)
+    append(string[position:])
+
+    return ''.join(final_string)
+
+
+def resolve_spaces(string, position, end, spaces_to_add, append):
+    '''
+    Copy string[position:end] up to and including the first run of spaces
+    that can take spaces_to_add (lengthened, or shortened leaving at least
+    one space), adjusted. Returns the new position and the spaces still to
+    add (unchanged if no run of spaces could take them).
+    '''
+    for spaces in space_runs.finditer(string, position, end):
+        if spaces_to_add > 0 or spaces.end() - spaces.start() > -spaces_to_add:
+            append(string[position:spaces.start()])
+            append(' ' * (spaces.end() - spaces.start() + spaces_to_add))
+            return spaces.end(), 0
+    return position, spaces_to_add
+
+
+def parse_chord_line(string, current_key):
+    '''
+    Split a line of chords into key-neutral pieces: text stays as it is and
+    each chord root becomes (root length, scale degree, half steps above the
+    key) so that the line can be rendered into any key without rescanning it.
+    '''
+    pieces = []
+
+    for token in chord_line_tokens.finditer(string):
+        chord = token.group(1)
+
+        if chord is not None:
+            pieces.append((len(chord),) + encode_root(chord, current_key))
+        else:
+            pieces.append(token.group())
+
+    return pieces
+
+
+def render_chord_line(pieces, desired_key):
+    ''' Render a line of chords from parse_chord_line in the desired key. '''
+    return join_chord_line([piece if type(piece) == str else (piece[0], spell_root(piece[1], piece[2], desired_key))
+                            for piece in pieces])
+
+
+def transpose_lines(lines, current_key, desired_key):
+    '''
+    Transpose the text of a song one line at a time: lines is any iterable of
+    lines (e.g. an open song file) and each line is yielded as soon as it's
+    read, with its line ending kept. Lines are classified the same way as
+    when a song is parsed (the first line that isn't blank is the title,
+    lines with a '[' are headings, the rest are chords or lyrics), and only
+    the lines of chords change, with the chords kept above the same lyrics.
+    '''
+    try:
+        chords_dict = transposition_table[(current_key, desired_key)]
+    except KeyError:
+        raise ValueError('Can\'t transpose from "%s" to "%s"' % (current_key, desired_key)) from None
+
+    title_found = False
+
+    for line in lines:
+        text = line.rstrip('\r\n')
+
+        # blank lines are kept as they are (and don't count as the title)
+        if not text.strip():
+            yield line
+            continue
+
+        # a space is added to the end of the line (as when a song is parsed) so a chord at the end of
+        # the line has spaces to take from or give back to, and taken off again afterwards
+        if title_found and '[' not in text and classify_line(text + ' ') == 'chords':
+            line = replace_chords(text + ' ', chords_dict).rstrip(' ') + line[len(text):]
+
+        title_found = True
+        yield line
+
+
+def transpose_text(text, current_key, desired_key):
+    ''' Transpose the text of a song from current_key to desired_key (see transpose_lines). '''
+    return ''.join(transpose_lines(text.splitlines(keepends=True), current_key, desired_key))
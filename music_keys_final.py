@@ -21,6 +21,7 @@ from reportlab.lib.pagesizes import LETTER
 from reportlab.lib.colors import HexColor
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+from music_theory import transposition_table
 
 # changing current directory
 master_path = '/Users/Jonathan/Desktop/oaks_music'
@@ -28,221 +29,6 @@ os.chdir(master_path)
 
 
 
-################################################################################
-
-# Importing previous work with copyright - for music scales processing
-
-# MIT License
-#
-# Copyright (c) 2021 Manohar Vanga
-#
-# Permission is hereby granted, free of charge, to any person obtaining a copy
-# of this software and associated documentation files (the "Software"), to deal
-# in the Software without restriction, including without limitation the rights
-# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
-# copies of the Software, and to permit persons to whom the Software is
-# furnished to do so, subject to the following conditions:
-#
-# The above copyright notice and this permission notice shall be included in all
-# copies or substantial portions of the Software.
-#
-# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
-# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
-# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
-# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
-# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
-# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
-# SOFTWARE.
-
-
-# The musical alphabet consists of seven letter from A through G
-alphabet = ['C', 'D', 'E', 'F', 'G', 'A', 'B']
-
-# The twelve notes in Western music, along with their enharmonic equivalents
-notes = [
-    ['B#',  'C',  'Dbb'],
-    ['B##', 'C#', 'Db'],
-    ['C##', 'D',  'Ebb'],
-    ['D#',  'Eb', 'Fbb'],
-    ['D##', 'E',  'Fb'],
-    ['E#',  'F',  'Gbb'],
-    ['E##', 'F#', 'Gb'],
-    ['F##', 'G',  'Abb'],
-    ['G#',  'Ab'],
-    ['G##', 'A',  'Bbb'],
-    ['A#',  'Bb', 'Cbb'],
-    ['A##', 'B',  'Cb'],
-]
-
-
-def find_note_index(scale, search_note):
-    ''' Given a scale, find the index of a particular note '''
-    for i, note in enumerate(scale):
-        # Deal with situations where we have a list of enharmonic
-        # equivalents, as well as just a single note as and str.
-        if type(note) == list:
-            if search_note in note:
-                return i
-        elif type(note) == str:
-            if search_note == note:
-                return i
-
-
-def rotate(scale, n):
-    ''' Left-rotate a scale by n positions. '''
-    return scale[n:] + scale[:n]
-
-
-def chromatic(key):
-    ''' Generate a chromatic scale in a given key. '''
-    # Figure out how much to rotate the notes list by and return
-    # the rotated version.
-    num_rotations = find_note_index(notes, key)
-    return rotate(notes, num_rotations)
-
-
-# Interval names that specify the distance between two notes
-intervals = [
-    ['P1', 'd2'],  # Perfect unison   Diminished second
-    ['m2', 'A1'],  # Minor second     Augmented unison
-    ['M2', 'd3'],  # Major second     Diminished third
-    ['m3', 'A2'],  # Minor third      Augmented second
-    ['M3', 'd4'],  # Major third      Diminished fourth
-    ['P4', 'A3'],  # Perfect fourth   Augmented third
-    ['d5', 'A4'],  # Diminished fifth Augmented fourth
-    ['P5', 'd6'],  # Perfect fifth    Diminished sixth
-    ['m6', 'A5'],  # Minor sixth      Augmented fifth
-    ['M6', 'd7'],  # Major sixth      Diminished seventh
-    ['m7', 'A6'],  # Minor seventh    Augmented sixth
-    ['M7', 'd8'],  # Major seventh    Diminished octave
-    ['P8', 'A7'],  # Perfect octave   Augmented seventh
-]
-
-# Interval names based off the notes of the major scale
-intervals_major = [
-    [ '1', 'bb2'],
-    ['b2',  '#1'],
-    [ '2', 'bb3',   '9'],
-    ['b3',  '#2'],
-    [ '3',  'b4'],
-    [ '4',  '#3',  '11'],
-    ['b5',  '#4', '#11'],
-    [ '5', 'bb6'],
-    ['b6',  '#5'],
-    [ '6', 'bb7',  '13'],
-    ['b7',  '#6'],
-    [ '7',  'b8'],
-    [ '8',  '#7'],
-]
-
-
-def find_note_by_root(notes, root):
-    '''
-    Given a list of notes, find it's alphabet. Useful for figuring out which
-    enharmonic equivalent we must use in a particular scale.
-    '''
-    for note in notes:
-        if note[0] == root:
-            return note
-
-def make_intervals_major(root):
-    labeled = {}
-    c = chromatic(root)
-    start_index = find_note_index(alphabet, root[0])
-    for i, interval in enumerate(intervals_major):
-        for interval_name in interval:
-            interval_index = int(re.sub('[b#]', '', interval_name)) - 1
-            note = c[i % len(c)]
-            note_root = alphabet[(start_index + interval_index) % len(alphabet)]
-            if note_root is not None:
-                labeled[interval_name] = find_note_by_root(note, note_root)
-    return labeled
-
-
-def make_formula(formula, labeled):
-    '''
-    Given a comma-separated interval formula, and a set of labeled
-    notes in a key, return the notes of the formula.
-    '''
-    return [labeled[x] for x in formula.split(',')]
-
-
-
-formulas = {
-    # Scale formulas
-    'scales': {
-        # Basic chromatic scale
-        'chromatic':          '1,b2,2,b3,3,4,b5,5,b6,6,b7,7',
-        # Major scale, its modes, and minor scale
-        'major':              '1,2,3,4,5,6,7',
-        'minor':              '1,2,b3,4,5,b6,b7',
-        # Melodic minor and its modes
-        'melodic_minor':      '1,2,b3,4,5,6,7',
-        # Harmonic minor and its modes
-        'harmonic_minor':     '1,2,b3,4,5,b6,7',
-        # Blues scales
-        'major_blues':        '1,2,b3,3,5,6',
-        'minor_blues':        '1,b3,4,b5,5,b7',
-        # Penatatonic scales
-        'pentatonic_major':   '1,2,3,5,6',
-        'pentatonic_minor':   '1,b3,4,5,b7',
-        'pentatonic_blues':   '1,b3,4,b5,5,b7',
-    },
-    'chords': {
-        # Major
-        'major':              '1,3,5',
-        'major_6':            '1,3,5,6',
-        'major_6_9':          '1,3,5,6,9',
-        'major_7':            '1,3,5,7',
-        'major_9':            '1,3,5,7,9',
-        'major_13':           '1,3,5,7,9,11,13',
-        'major_7_#11':        '1,3,5,7,#11',
-        # Minor
-        'minor':              '1,b3,5',
-        'minor_6':            '1,b3,5,6',
-        'minor_6_9':          '1,b3,5,6,9',
-        'minor_7':            '1,b3,5,b7',
-        'minor_9':            '1,b3,5,b7,9',
-        'minor_11':           '1,b3,5,b7,9,11',
-        'minor_7_b5':         '1,b3,b5,b7',
-        # Dominant
-        'dominant_7':         '1,3,5,b7',
-        'dominant_9':         '1,3,5,b7,9',
-        'dominant_11':        '1,3,5,b7,9,11',
-        'dominant_13':        '1,3,5,b7,9,11,13',
-        'dominant_7_#11':     '1,3,5,b7,#11',
-        # Diminished
-        'diminished':         '1,b3,b5',
-        'diminished_7':       '1,b3,b5,bb7',
-        'diminished_7_half':  '1,b3,b5,b7',
-        # Augmented
-        'augmented':          '1,3,#5',
-        # Suspended
-        'sus2':               '1,2,5',
-        'sus4':               '1,4,5',
-        '7sus2':              '1,2,5,b7',
-        '7sus4':              '1,4,5,b7',
-    },
-}
-
-# define sharp and flat variables
-flat = '\u266d'
-sharp = '\u266f'
-
-
-
-def format_scales(scale, separator=' '):
-    '''
-    Pretty-print the notes of a scale. Replaces b and # characters
-    for unicode flat and sharp symbols.
-    '''
-    return separator.join(['{:<3s}'.format(x) for x in scale]) \
-                    .replace('b', flat) \
-                    .replace('#', sharp)
-
-##############################################################################
-
-
 # define a function to read in a song with a given key and parse it out
 # into chords/lyrics/headers/title
 def read_song(song_title, desired_key):
@@ -304,41 +90,9 @@ def read_song(song_title, desired_key):
     current_key = current_key = song_title.split(" ")[len(song_title.split(" ")) - 1].split(".")[0]
 
 
-    # get list of chords that are in the specified major keys
-    #dump(make_formula(formulas['scales']['major'], make_intervals_major(current_key))).strip()
-    chords_in_current_key = make_formula(formulas['scales']['major'], make_intervals_major(current_key))
-    chords_in_desired_key = make_formula(formulas['scales']['major'], make_intervals_major(desired_key))
-
-    # create a dictionary that has keys of current key notes and values of current key roman numerals
-    current_key_note_to_roman = {}
-    for i, j in enumerate(chords_in_current_key):
-        current_key_note_to_roman[j] = i+1
-
-    # create a dictionary that has keys of roman numerals for the desired key and values of chord names in desired key
-    desired_key_roman_to_note = {}
-    for i, j in enumerate(chords_in_desired_key):
-        desired_key_roman_to_note[i+1] = j
-
-    # use those dictionaries to go from current chords -> current roman -> desired roman -> desired chords
-
-    # transform chords in current key to get chords in desired key
-    transformed_chords = [desired_key_roman_to_note[current_key_note_to_roman[chord]] for chord in chords_in_current_key]
-
-    # create a dictionary to use those chords in a desired key paired with the current key for replacing
-    transformed_chords_dict = {}
-    for i in range(len(chords_in_current_key)):
-        transformed_chords_dict[chords_in_current_key[i]] = transformed_chords[i]
-
-    # add to the transformed chords dictionary to include m/maj7/7 chords as well
-    #m_chords = {a + 'm' : b + 'm' for a,b in transformed_chords_dict.items()}
-    #maj7_chords = {a + 'maj7' : b + 'maj7' for a,b in transformed_chords_dict.items()}
-    #seven_chords = {a + '7' : b + '7' for a,b in transformed_chords_dict.items()}
-
-    # combine chords dictionaries
-    # combine chords dictionaries
-    #chords_dict = {**transformed_chords_dict, **m_chords, **maj7_chords, **seven_chords}
-    chords_dict = transformed_chords_dict
-    #chords_dict = {a.replace('b', flat).replace('#', sharp) : b.replace('b', flat).replace('#', sharp) for a, b in transformed_chords_dict.items()}
+    # get the chord replacement dictionary for this pair of keys from the precomputed transposition table
+    # (chords in the current key keep their scale degree, anything out of key is moved chromatically)
+    chords_dict = transposition_table[(current_key, desired_key)]
 
 
     # define a function to replace chords
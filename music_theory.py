@@ -0,0 +1,308 @@
+# Music theory tables and helpers shared by the chord chart scripts
+
+# This file holds the scale/interval processing borrowed from Manohar Vanga
+# along with a transposition table that is built once when the module is
+# imported, so that transposing a chord root is a single dictionary lookup.
+
+
+
+# Importing Libraries
+import re
+
+
+################################################################################
+
+# Importing previous work with copyright - for music scales processing
+
+# MIT License
+#
+# Copyright (c) 2021 Manohar Vanga
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# The musical alphabet consists of seven letter from A through G
+alphabet = ['C', 'D', 'E', 'F', 'G', 'A', 'B']
+
+# The twelve notes in Western music, along with their enharmonic equivalents
+notes = [
+    ['B#',  'C',  'Dbb'],
+    ['B##', 'C#', 'Db'],
+    ['C##', 'D',  'Ebb'],
+    ['D#',  'Eb', 'Fbb'],
+    ['D##', 'E',  'Fb'],
+    ['E#',  'F',  'Gbb'],
+    ['E##', 'F#', 'Gb'],
+    ['F##', 'G',  'Abb'],
+    ['G#',  'Ab'],
+    ['G##', 'A',  'Bbb'],
+    ['A#',  'Bb', 'Cbb'],
+    ['A##', 'B',  'Cb'],
+]
+
+
+def find_note_index(scale, search_note):
+    ''' Given a scale, find the index of a particular note '''
+    for i, note in enumerate(scale):
+        # Deal with situations where we have a list of enharmonic
+        # equivalents, as well as just a single note as and str.
+        if type(note) == list:
+            if search_note in note:
+                return i
+        elif type(note) == str:
+            if search_note == note:
+                return i
+
+
+def rotate(scale, n):
+    ''' Left-rotate a scale by n positions. '''
+    return scale[n:] + scale[:n]
+
+
+def chromatic(key):
+    ''' Generate a chromatic scale in a given key. '''
+    # Figure out how much to rotate the notes list by and return
+    # the rotated version.
+    num_rotations = find_note_index(notes, key)
+    return rotate(notes, num_rotations)
+
+
+# Interval names that specify the distance between two notes
+intervals = [
+    ['P1', 'd2'],  # Perfect unison   Diminished second
+    ['m2', 'A1'],  # Minor second     Augmented unison
+    ['M2', 'd3'],  # Major second     Diminished third
+    ['m3', 'A2'],  # Minor third      Augmented second
+    ['M3', 'd4'],  # Major third      Diminished fourth
+    ['P4', 'A3'],  # Perfect fourth   Augmented third
+    ['d5', 'A4'],  # Diminished fifth Augmented fourth
+    ['P5', 'd6'],  # Perfect fifth    Diminished sixth
+    ['m6', 'A5'],  # Minor sixth      Augmented fifth
+    ['M6', 'd7'],  # Major sixth      Diminished seventh
+    ['m7', 'A6'],  # Minor seventh    Augmented sixth
+    ['M7', 'd8'],  # Major seventh    Diminished octave
+    ['P8', 'A7'],  # Perfect octave   Augmented seventh
+]
+
+# Interval names based off the notes of the major scale
+intervals_major = [
+    [ '1', 'bb2'],
+    ['b2',  '#1'],
+    [ '2', 'bb3',   '9'],
+    ['b3',  '#2'],
+    [ '3',  'b4'],
+    [ '4',  '#3',  '11'],
+    ['b5',  '#4', '#11'],
+    [ '5', 'bb6'],
+    ['b6',  '#5'],
+    [ '6', 'bb7',  '13'],
+    ['b7',  '#6'],
+    [ '7',  'b8'],
+    [ '8',  '#7'],
+]
+
+
+def find_note_by_root(notes, root):
+    '''
+    Given a list of notes, find it's alphabet. Useful for figuring out which
+    enharmonic equivalent we must use in a particular scale.
+    '''
+    for note in notes:
+        if note[0] == root:
+            return note
+
+def make_intervals_major(root):
+    labeled = {}
+    c = chromatic(root)
+    start_index = find_note_index(alphabet, root[0])
+    for i, interval in enumerate(intervals_major):
+        for interval_name in interval:
+            interval_index = int(re.sub('[b#]', '', interval_name)) - 1
+            note = c[i % len(c)]
+            note_root = alphabet[(start_index + interval_index) % len(alphabet)]
+            if note_root is not None:
+                labeled[interval_name] = find_note_by_root(note, note_root)
+    return labeled
+
+
+def make_formula(formula, labeled):
+    '''
+    Given a comma-separated interval formula, and a set of labeled
+    notes in a key, return the notes of the formula.
+    '''
+    return [labeled[x] for x in formula.split(',')]
+
+
+
+formulas = {
+    # Scale formulas
+    'scales': {
+        # Basic chromatic scale
+        'chromatic':          '1,b2,2,b3,3,4,b5,5,b6,6,b7,7',
+        # Major scale, its modes, and minor scale
+        'major':              '1,2,3,4,5,6,7',
+        'minor':              '1,2,b3,4,5,b6,b7',
+        # Melodic minor and its modes
+        'melodic_minor':      '1,2,b3,4,5,6,7',
+        # Harmonic minor and its modes
+        'harmonic_minor':     '1,2,b3,4,5,b6,7',
+        # Blues scales
+        'major_blues':        '1,2,b3,3,5,6',
+        'minor_blues':        '1,b3,4,b5,5,b7',
+        # Penatatonic scales
+        'pentatonic_major':   '1,2,3,5,6',
+        'pentatonic_minor':   '1,b3,4,5,b7',
+        'pentatonic_blues':   '1,b3,4,b5,5,b7',
+    },
+    'chords': {
+        # Major
+        'major':              '1,3,5',
+        'major_6':            '1,3,5,6',
+        'major_6_9':          '1,3,5,6,9',
+        'major_7':            '1,3,5,7',
+        'major_9':            '1,3,5,7,9',
+        'major_13':           '1,3,5,7,9,11,13',
+        'major_7_#11':        '1,3,5,7,#11',
+        # Minor
+        'minor':              '1,b3,5',
+        'minor_6':            '1,b3,5,6',
+        'minor_6_9':          '1,b3,5,6,9',
+        'minor_7':            '1,b3,5,b7',
+        'minor_9':            '1,b3,5,b7,9',
+        'minor_11':           '1,b3,5,b7,9,11',
+        'minor_7_b5':         '1,b3,b5,b7',
+        # Dominant
+        'dominant_7':         '1,3,5,b7',
+        'dominant_9':         '1,3,5,b7,9',
+        'dominant_11':        '1,3,5,b7,9,11',
+        'dominant_13':        '1,3,5,b7,9,11,13',
+        'dominant_7_#11':     '1,3,5,b7,#11',
+        # Diminished
+        'diminished':         '1,b3,b5',
+        'diminished_7':       '1,b3,b5,bb7',
+        'diminished_7_half':  '1,b3,b5,b7',
+        # Augmented
+        'augmented':          '1,3,#5',
+        # Suspended
+        'sus2':               '1,2,5',
+        'sus4':               '1,4,5',
+        '7sus2':              '1,2,5,b7',
+        '7sus4':              '1,4,5,b7',
+    },
+}
+
+# define sharp and flat variables
+flat = '\u266d'
+sharp = '\u266f'
+
+
+
+def format_scales(scale, separator=' '):
+    '''
+    Pretty-print the notes of a scale. Replaces b and # characters
+    for unicode flat and sharp symbols.
+    '''
+    return separator.join(['{:<3s}'.format(x) for x in scale]) \
+                    .replace('b', flat) \
+                    .replace('#', sharp)
+
+##############################################################################
+
+
+# key-neutral chord roots: a chord root in a song is stored as its scale degree in the song's major key (if it's
+# in the key) and the number of half steps it is above the key, so that it can be spelled in any other key
+
+# every note name is a possible key and a possible chord root
+note_names = [note for enharmonics in notes for note in enharmonics]
+
+# position of each note name in the chromatic scale starting on C
+note_index = {note: i for i, enharmonics in enumerate(notes) for note in enharmonics}
+
+# major scale for each key and the scale degree of each note in it
+major_scales = {key: make_formula(formulas['scales']['major'], make_intervals_major(key)) for key in note_names}
+scale_degrees = {key: {note: i+1 for i, note in enumerate(scale)} for key, scale in major_scales.items()}
+
+# keys whose major scale can be spelled without triple sharps or flats (songs can only be put into these - the
+# scales of B##, Fbb, D##, E##, G## and A## have notes that can't be written, which are left as None)
+spelled_keys = [key for key in note_names if None not in major_scales[key]]
+
+
+def simplest_note_name(note_options):
+    '''
+    Given a list of enharmonic equivalents, pick the simplest name (fewest
+    characters, first one on a tie), writing D# and A# as Eb and Bb since
+    they are easier to read.
+    '''
+    min_length = min([len(i) for i in note_options])
+
+    return [note for note in note_options if len(note) == min_length][0].replace('D#', 'Eb').replace('A#', 'Bb')
+
+
+# simplest name for each of the twelve notes
+simplest_names = [simplest_note_name(enharmonics) for enharmonics in notes]
+
+
+def encode_root(chord, current_key):
+    '''
+    Given a chord root and the key of the song, return the key-neutral form
+    of the root: (scale degree in the key or None, half steps above the key).
+    '''
+    return scale_degrees[current_key].get(chord), (note_index[chord] - note_index[current_key]) % 12
+
+
+def spell_root(degree, offset, desired_key):
+    '''
+    Spell a key-neutral chord root in the desired key. Roots in the key keep
+    their scale degree; anything else is given the simplest name for the note
+    the same number of half steps above the desired key.
+    '''
+    if degree is not None:
+        return major_scales[desired_key][degree - 1]
+
+    return simplest_names[(note_index[desired_key] + offset) % 12]
+
+
+# build a table of every (current key, desired key) pair that maps each chord root to its root in the desired key
+# this used to be worked out inside read_song for every song and every out of key chord (with a chromatic()
+# scan per chord), but it only depends on the two keys, so we do it once here when the module is imported
+
+def build_transposition_table():
+    '''
+    Build a dictionary keyed on (current key, desired key) whose values map
+    every note name to the name it should be spelled as in the desired key.
+    Only keys whose scale can be spelled (spelled_keys) are included, so a
+    lookup with any other key fails with a KeyError.
+    '''
+    encoded_roots = {current_key: [(chord, encode_root(chord, current_key)) for chord in note_names]
+                     for current_key in spelled_keys}
+
+    return {(current_key, desired_key): {chord: spell_root(degree, offset, desired_key)
+                                         for chord, (degree, offset) in encoded_roots[current_key]}
+            for current_key in spelled_keys for desired_key in spelled_keys}
+
+
+transposition_table = build_transposition_table()
+
+
+def transpose_root(chord, current_key, desired_key):
+    ''' Look up the root of a chord in the desired key ('NA' if it can't be transposed). '''
+    try:
+        return transposition_table[(current_key, desired_key)][chord]
+    except KeyError:
+        return 'NA'
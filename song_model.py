@@ -0,0 +1,200 @@
+# Reading songs and putting them into a new key
+
+# This file reads in a text file with lyrics and chords once and parses it
+# into a key-neutral song (chords are stored by scale degree/half steps from
+# the song's key), which can then be rendered cheaply into any desired key.
+
+
+
+# Importing Libraries
+import io
+import os
+import re
+import pickle
+import hashlib
+import threading
+
+from chord_lines import classify_line, parse_chord_line, render_chord_line
+from chart_timing import lap
+from atomic_files import write_atomic
+
+
+# a song is kept as a list of light line records rather than a DataFrame, since everything done with a song
+# is a loop over its lines (and for a 40 line song the DataFrame overhead was most of the work)
+
+class SongLine:
+    ''' One non-empty line of a song, with the chords (if any) stored key-neutral. '''
+
+    __slots__ = ('text', 'line_class', 'nchar', 'nspace', 'chord_pieces')
+
+    def __init__(self, text, line_class, nchar, nspace, chord_pieces=None):
+        self.text = text
+        self.line_class = line_class
+        self.nchar = nchar
+        self.nspace = nspace
+        self.chord_pieces = chord_pieces
+
+
+class Song:
+    ''' A parsed song: its lines, the key it was written in and its layout on a chart (see chart_layout, once worked out). '''
+
+    __slots__ = ('lines', 'current_key', 'layout')
+
+    def __init__(self, lines, current_key, layout=None):
+        self.lines = lines
+        self.current_key = current_key
+        self.layout = layout
+
+
+class RenderedSong:
+    ''' A song put into a key: its lines plus the text of each line (text2) in that key, and the parsed song it came from. '''
+
+    __slots__ = ('lines', 'key', 'text2', 'song')
+
+    def __init__(self, lines, key, text2, song):
+        self.lines = lines
+        self.key = key
+        self.text2 = text2
+        self.song = song
+
+
+# parsed songs are cached on a hash of the file contents (plus the key in the file name, since chords are
+# stored relative to it), so reading the same song again only costs reading and hashing the file
+# bump parser_version whenever parse_song_text changes so that songs cached on disk get parsed again
+parser_version = '3'
+max_cached_songs = 256
+parsed_songs = {}
+parsed_songs_lock = threading.Lock()
+
+
+def song_cache_key(song_bytes, current_key):
+    ''' Hash of a song's file contents, its key and the parser version. '''
+    return hashlib.sha256(parser_version.encode() + b'\0' + current_key.encode() + b'\0' + song_bytes).hexdigest()
+
+
+def get_current_key(song_title):
+    ''' Get the current key of a song from its file name (e.g. "One of Us chords - B.txt"). '''
+    return song_title.split(" ")[len(song_title.split(" ")) - 1].split(".")[0]
+
+
+# define a function to read in a song and parse it out into chords/lyrics/headers/title
+# (cache_dir is an optional folder to keep parsed songs in between runs)
+def parse_song(song_title, cache_dir=None):
+
+    # load text file with lyrics and chords
+    with open(song_title, 'rb') as f:
+        song_bytes = f.read()
+    lap('read')
+
+    return(parse_song_bytes(song_bytes, get_current_key(os.path.basename(song_title)), cache_dir=cache_dir))
+
+
+
+# define a function to parse the contents of a song file that has already been read in (through the caches)
+def parse_song_bytes(song_bytes, current_key, cache_dir=None):
+
+    cache_key = song_cache_key(song_bytes, current_key)
+
+    # check the cache in memory first, then on disk
+    song = parsed_songs.get(cache_key)
+    if song is not None:
+        return song
+
+    song = None
+    if cache_dir is not None:
+        try:
+            with open(os.path.join(cache_dir, cache_key + '.pickle'), 'rb') as f:
+                song = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            song = None
+
+    if song is None:
+        song = parse_song_text(song_bytes, current_key)
+
+        # save the parsed song to disk (through a temporary file and a rename, see atomic_files)
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            write_atomic(os.path.join(cache_dir, cache_key + '.pickle'), pickle.dumps(song))
+
+    # keep the most recently parsed songs in memory (the lock keeps threads from dropping the same song twice)
+    with parsed_songs_lock:
+        while len(parsed_songs) >= max_cached_songs:
+            del parsed_songs[next(iter(parsed_songs))]
+        parsed_songs[cache_key] = song
+
+    return song
+
+
+
+def drop_parsed_song(song_path):
+    '''
+    Drop a song file's parsed song from memory, if it's there (e.g. once a
+    batch has printed it in all its keys and won't need it again), leaving
+    every other parsed song cached.
+    '''
+    try:
+        with open(song_path, 'rb') as f:
+            song_bytes = f.read()
+    except OSError:
+        return
+
+    with parsed_songs_lock:
+        parsed_songs.pop(song_cache_key(song_bytes, get_current_key(os.path.basename(song_path))), None)
+
+
+
+# define a function to parse the contents of a song file in a given key
+def parse_song_text(song_bytes, current_key):
+
+    # split the file into lines the same way reading it as a text file would
+    song = io.TextIOWrapper(io.BytesIO(song_bytes), encoding='utf-8').readlines()
+
+    # only keep lines that aren't empty, and add a space to each line of text for chord integrity in transpositions
+    texts = [line.strip('\n') + ' ' for line in song if any(line.strip('\n').strip())]
+
+    lines = []
+    for i, text in enumerate(texts):
+
+        # isolate classes in the song - the first line is the title and anything in brackets is a heading,
+        # then classify the rest of the lines into chords and lyrics, one line at a time
+        # (a line is chords if every token in it is a chord, otherwise lines with more spaces than text are chords)
+        if i == 0:
+            line_class = 'title'
+        elif '[' in text:
+            line_class = 'heading'
+        else:
+            line_class = classify_line(text)
+
+        # add number of characters that aren't spacing and number of spaces in text
+        nchar = len(re.sub(r"\s+", "", text))
+        nspace = text.count(" ")
+
+        # now for the fun part - we need to be able to isolate the chords so they can be put into a new key
+        # store every chord line split up into text and key-neutral chord roots (scale degree and half steps
+        # above the current key), so putting the song into each new key doesn't need to find the chords again
+        chord_pieces = parse_chord_line(text, current_key) if line_class == 'chords' else None
+
+        lines.append(SongLine(text, line_class, nchar, nspace, chord_pieces))
+
+
+    return(Song(lines, current_key))
+
+
+
+# define a function to put a parsed song into the desired key
+def render_song(song, desired_key):
+
+    # create combined text with old lyrics and new chords
+    text2 = [render_chord_line(line.chord_pieces, desired_key) if line.line_class == 'chords' else line.text
+             for line in song.lines]
+
+
+    return(RenderedSong(song.lines, desired_key, text2, song))
+
+
+
+# define a function to read in a song with a given key and parse it out
+# into chords/lyrics/headers/title
+def read_song(song_title, desired_key, cache_dir=None):
+
+    return(render_song(parse_song(song_title, cache_dir=cache_dir), desired_key))
@@ -0,0 +1,53 @@
+# Transposing the text of a song
+
+# This file prints the text of a song in another key, with the chords kept
+# lined up over the lyrics, without printing a PDF (e.g. to paste into
+# projector software or a message). The current key is read from the end of
+# the file name (as for the chord charts) unless it's given with --from.
+# The song is transposed line by line as it's read, so '-' reads it from
+# standard input.
+
+# Usage: python transpose_song_text.py "Mighty Cross chords - G.txt" A [--from G] [--output song.txt]
+#        cat song.txt | python transpose_song_text.py - A --from G
+
+
+
+
+# Importing Libraries
+import os
+import sys
+import argparse
+
+from chord_lines import transpose_lines
+from song_model import get_current_key
+
+
+###############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Print the text of a song in another key')
+    parser.add_argument('song', help="song .txt file ('-' for standard input)")
+    parser.add_argument('desired_key', help='key to put the song in')
+    parser.add_argument('--from', dest='current_key', help='key the song is written in (default: from the end of the file name)')
+    parser.add_argument('--output', help='file to write the song to (default: standard output)')
+
+    args = parser.parse_args()
+
+    if args.current_key is None and args.song == '-':
+        parser.error('--from is needed when reading from standard input')
+    current_key = args.current_key or get_current_key(os.path.basename(args.song))
+
+    song_file = sys.stdin if args.song == '-' else open(args.song, encoding='utf-8')
+    output_file = sys.stdout if args.output is None else open(args.output, 'w', encoding='utf-8')
+
+    try:
+        for line in transpose_lines(song_file, current_key, args.desired_key):
+            output_file.write(line)
+    except ValueError as error:
+        sys.exit(str(error))
+    finally:
+        if song_file is not sys.stdin:
+            song_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()